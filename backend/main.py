@@ -21,6 +21,7 @@ from fastapi.staticfiles import StaticFiles
 
 from services.database_connector import init_mock_db
 from services.compliance_monitor import run_compliance_check
+from services.policy_engine import prewarm_vertex_in_background
 from utils.debug_logger import debug_router, get_logger
 
 # Routers
@@ -70,6 +71,10 @@ async def lifespan(app: FastAPI):
         logger.error(f"Startup: database init failed — {e}")
 
     # TruFor engine is lazy-loaded on first request to keep startup fast.
+
+    # Import the Vertex AI SDK in the background so the first policy upload
+    # doesn't pay its cold-import cost.
+    prewarm_vertex_in_background()
     
     # Start the background scan scheduler
     scan_task = asyncio.create_task(scheduled_scan())
@@ -14,7 +14,7 @@ from pydantic import BaseModel
 from services.compliance_monitor import run_compliance_check
 from services.database_connector import get_db_connection, execute_full_query
 from services.pipeline_orchestrator import analyze_structural
-from services.policy_engine import extract_rules_from_document, get_all_policies, save_policy, get_policy_by_name, delete_policy, clear_all_policies
+from services.policy_engine import extract_rules_from_document_async, get_all_policies, save_policy, get_policy_by_name, delete_policy, clear_all_policies
 from utils.debug_logger import get_logger
 
 logger = get_logger()
@@ -65,7 +65,7 @@ async def upload_policy(
         # ── AI rule extraction & persistence ─────────────────────────────────
         # Note: We now pass the absolute path of the PDF directly to Vertex AI 
         # for Multimodal OCR extraction instead of doing local text parsing.
-        rules = extract_rules_from_document(str(temp_path), file.filename)
+        rules = await extract_rules_from_document_async(str(temp_path), file.filename)
         
         # Prevent saving Null or empty policies
         if not rules:
@@ -23,6 +23,76 @@ def get_db_connection() -> sqlite3.Connection:
     return conn
 
 
+# WITHOUT ROWID: rows are clustered on the TEXT primary key, so upserts and
+# id lookups hit a single B-tree instead of rowid table + autoindex.
+_CREATE_POLICIES_SQL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        rules BLOB NOT NULL,   -- orjson-encoded rule list (older rows may be TEXT)
+        active INTEGER NOT NULL DEFAULT 1,
+        created_at TEXT NOT NULL
+    ) WITHOUT ROWID
+"""
+
+
+def _ensure_policies_indexes(cursor: sqlite3.Cursor) -> None:
+    # Partial index: active-policy scans skip soft-deleted rows entirely
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_policies_active ON policies(active) WHERE active = 1"
+    )
+    # Duplicate-name check on upload (get_policy_by_name)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_policies_name ON policies(name)")
+
+
+def _migrate_policies_without_rowid(cursor: sqlite3.Cursor) -> None:
+    """Rebuild a legacy rowid ``policies`` table as WITHOUT ROWID, atomically and only once."""
+    row = cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'policies'"
+    ).fetchone()
+    if row is None or "WITHOUT ROWID" in row[0].upper():
+        return
+
+    logger.info("Migrating policies table to WITHOUT ROWID...")
+    cursor.executescript(f"""
+        BEGIN;
+        DROP TABLE IF EXISTS policies_new;
+        {_CREATE_POLICIES_SQL.format(table="policies_new")};
+        INSERT INTO policies_new (id, name, rules, active, created_at)
+            SELECT id, name, rules, active, created_at FROM policies;
+        DROP TABLE policies;
+        ALTER TABLE policies_new RENAME TO policies;
+        COMMIT;
+    """)
+
+
+def ensure_aml_support_objects(cursor: sqlite3.Cursor) -> None:
+    """
+    Create the indexes and enriched view used by AML rules over the dataset
+    tables. Rules join financial_transactions to bank_accounts on both sides of
+    a transfer; the view gives them one stable definition of that join, and the
+    account_number index turns each side into an index lookup.
+    No-op if the dataset tables have not been loaded.
+    """
+    try:
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_ba_acct ON bank_accounts(account_number)")
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_ft_amount_format "
+            "ON financial_transactions(amount_paid, payment_format)"
+        )
+        cursor.execute("""
+            CREATE VIEW IF NOT EXISTS v_financial_transactions_enriched AS
+            SELECT ft.*,
+                   ba_from.entity_name AS sender_entity,
+                   ba_to.entity_name   AS receiver_entity
+            FROM financial_transactions ft
+            LEFT JOIN bank_accounts ba_from ON ft.from_account = ba_from.account_number
+            LEFT JOIN bank_accounts ba_to   ON ft.to_account   = ba_to.account_number
+        """)
+    except sqlite3.OperationalError as e:
+        logger.warning(f"AML indexes/view not created (dataset tables missing?): {e}")
+
+
 def init_mock_db() -> None:
     """
     Initialise the mock company database.
@@ -37,15 +107,9 @@ def init_mock_db() -> None:
         cursor = conn.cursor()
         try:
             # Always ensure the policies table exists (may be missing in older DBs)
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS policies (
-                    id TEXT PRIMARY KEY,
-                    name TEXT NOT NULL,
-                    rules TEXT NOT NULL,
-                    active INTEGER NOT NULL DEFAULT 1,
-                    created_at TEXT NOT NULL
-                )
-            """)
+            cursor.execute(_CREATE_POLICIES_SQL.format(table="policies"))
+            _migrate_policies_without_rowid(cursor)
+            _ensure_policies_indexes(cursor)
             # Always ensure the audit_logs table exists
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS audit_logs (
@@ -62,6 +126,7 @@ def init_mock_db() -> None:
                 cursor.execute("ALTER TABLE audit_logs ADD COLUMN record_id TEXT")
             except sqlite3.OperationalError:
                 pass
+            ensure_aml_support_objects(cursor)
             conn.commit()
             cursor.execute("SELECT COUNT(*) FROM expenses")
             if cursor.fetchone()[0] > 0:
@@ -117,15 +182,8 @@ def init_mock_db() -> None:
         )
     """)
 
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS policies (
-            id TEXT PRIMARY KEY,
-            name TEXT NOT NULL,
-            rules TEXT NOT NULL,
-            active INTEGER NOT NULL DEFAULT 1,
-            created_at TEXT NOT NULL
-        )
-    """)
+    cursor.execute(_CREATE_POLICIES_SQL.format(table="policies"))
+    _ensure_policies_indexes(cursor)
 
     cursor.execute("""
         CREATE TABLE IF NOT EXISTS audit_logs (
@@ -174,6 +232,8 @@ def init_mock_db() -> None:
     # Dataset ingestion — fully delegated to DatasetLoader
     # ------------------------------------------------------------------
     DatasetLoader().load_all(conn)
+    ensure_aml_support_objects(cursor)
+    conn.commit()
 
     conn.close()
     logger.info(f"Mock database initialised at {DB_PATH}")
@@ -10,9 +10,8 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-PROJECT_ID = os.getenv("GOOGLE_CLOUD_PROJECT", os.getenv("PROJECT_ID", "your-project-id"))
-REGION = os.getenv("REGION", "asia-south1")
 from prompts.model_context import FORENSIC_DECISION_TREE
+from utils.vertex_utils import init_vertex
 
 def run_semantic_reasoning_sync_wrapper(gcs_uri, mime_type, local_report):
     """
@@ -26,10 +25,9 @@ async def run_semantic_reasoning(gcs_uri, mime_type="application/pdf", local_rep
     Now ASYNC to prevent blocking the main event loop.
     """
     # Lazy imports: vertexai only loads the first time this function is called
-    import vertexai  # noqa: PLC0415
     from vertexai.generative_models import GenerativeModel, Part  # noqa: PLC0415
     try:
-        vertexai.init(project=PROJECT_ID, location=REGION)
+        init_vertex()
     except Exception as e:
         pass  # Already initialised or placeholder ID — handled below
 
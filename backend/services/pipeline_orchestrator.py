@@ -252,7 +252,7 @@ async def analyze_cryptographic(file_path: str, callback=None):
     }
     
     try:
-        from utils.crypto_utils import get_validation_context, validate_signature_forensic
+        from utils.crypto_utils import get_validation_context, validate_signatures_forensic
         
         # 1. Get Smart Context (AIA, OCSP, Soft-Fail, Hybrid Trust)
         if callback: await callback("Loading Hybrid Trust Store (Mozilla + Local)...")
@@ -267,14 +267,16 @@ async def analyze_cryptographic(file_path: str, callback=None):
                 results['details']['signature_count'] = 0
                 return results
                 
-            sig_status = []
-            
-            for sig in r.embedded_signatures:
-                if callback: await callback(f"Verifying Signature: {sig.field_name}...")
-                
-                # Use robust wrapper
-                status = await validate_signature_forensic(sig, vc)
-                sig_status.append(status)
+            signatures = r.embedded_signatures
+            if callback:
+                names = ", ".join(sig.field_name for sig in signatures)
+                await callback(f"Verifying Signature(s): {names}...")
+
+            # Use robust wrapper; signatures are validated concurrently so their
+            # revocation / AIA fetches overlap
+            sig_status = await validate_signatures_forensic(signatures, vc)
+
+            for status in sig_status:
                 
                 # DEBUG: Log the actual status returned
                 logger.info(f"Signature validation result for {status['field']}:")
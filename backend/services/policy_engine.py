@@ -1,134 +1,557 @@
+import asyncio
+import atexit
+import functools
+import hashlib
 import json
+import mmap
 import os
+import re
 import sqlite3
-from datetime import datetime, timezone
-from typing import Any
-from dotenv import load_dotenv
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import Any, Callable, Iterator
 
-load_dotenv()
+import orjson
 
 # vertexai and GenerativeModel are NOT imported at module level because
 # google-cloud-aiplatform has a heavy import chain (~28 s on first load).
-# They are imported lazily inside the functions that actually use them.
+# They are imported once on first use via _ensure_vertex_loaded() (or preloaded
+# in the background at startup by prewarm_vertex_in_background()).
 
 from services.database_connector import DB_PATH
 from utils.debug_logger import get_logger
+from utils.vertex_utils import init_vertex
 
 logger = get_logger()
 
-# GCP config read from env once (cheap — just os.getenv, no heavy import)
-project_id = os.getenv("GCP_PROJECT_ID", os.getenv("GOOGLE_CLOUD_PROJECT", "veridoc-frontend-808108840598"))
-location = os.getenv("REGION", "asia-south1")
+@functools.lru_cache(maxsize=1)
+def _ensure_env() -> None:
+    """
+    Load .env on first use. dotenv is imported here rather than at module
+    import, so API workers that never run the agent skip it (and its .env lookup).
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+
+@functools.lru_cache(maxsize=1)
+def _cfg() -> SimpleNamespace:
+    """
+    Policy-engine settings, read from the environment (and .env) once. Call
+    ``_cfg.cache_clear()`` after changing the environment to pick up new values.
+    """
+    _ensure_env()
+    return SimpleNamespace(
+        model_name=os.getenv("GEMINI_MODEL_NAME", "gemini-1.5-pro"),
+        turn_timeout=float(os.getenv("AGENT_TURN_TIMEOUT_SECONDS", str(_DEFAULT_AGENT_TURN_TIMEOUT_SECONDS))),
+        max_pdf_bytes=int(os.getenv("POLICY_MAX_PDF_BYTES", str(_DEFAULT_MAX_POLICY_PDF_BYTES))),
+        extraction_cache_path=os.getenv("EXTRACTION_CACHE_PATH", "extraction_cache.db"),
+        extraction_cache_ttl=int(os.getenv("EXTRACTION_CACHE_TTL_SECONDS", str(_DEFAULT_EXTRACTION_CACHE_TTL_SECONDS))),
+    )
+
+# ---------------------------------------------------------------------------
+# SQLite connection pool — one read-write and one read-only connection per
+# thread, reused across calls instead of connect/close (and a schema parse)
+# on every agent tool call or policy CRUD operation.
+# ---------------------------------------------------------------------------
+
+_conn_local = threading.local()
+_pooled_conns: list[sqlite3.Connection] = []
+_pool_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def _ensure_wal() -> None:
+    """
+    Put company_data.db in WAL mode once per process (the mode is persisted in
+    the file). Readers then work from a snapshot and never block on, or block,
+    save_policy/delete_policy writes.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+    finally:
+        conn.close()
+
+def _open_pooled_conn(read_only: bool) -> sqlite3.Connection:
+    _ensure_wal()
+    if read_only:
+        # mode=ro: nothing on this connection can write, agent-supplied SQL
+        # included (DROP/DELETE/INSERT fail with "attempt to write a readonly database").
+        # Autocommit, so a rejected DML statement can't leave an implicit BEGIN
+        # pinning this reader to a stale WAL snapshot.
+        conn = sqlite3.connect(
+            f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False, isolation_level=None
+        )
+    else:
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        conn.execute("PRAGMA wal_autocheckpoint=1000")
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-20000")
+    with _pool_lock:
+        _pooled_conns.append(conn)
+    return conn
+
+def _get_conn() -> sqlite3.Connection:
+    """Return this thread's pooled read-write connection to company_data.db."""
+    conn = getattr(_conn_local, "rw", None)
+    if conn is None:
+        conn = _conn_local.rw = _open_pooled_conn(read_only=False)
+    return conn
+
+def _get_readonly_conn() -> sqlite3.Connection:
+    """Return this thread's pooled read-only connection (agent tools and policy reads)."""
+    conn = getattr(_conn_local, "ro", None)
+    if conn is None:
+        conn = _conn_local.ro = _open_pooled_conn(read_only=True)
+    return conn
+
+@atexit.register
+def _close_pooled_conns() -> None:
+    with _pool_lock:
+        for conn in _pooled_conns:
+            conn.close()
+        _pooled_conns.clear()
+
+# The DB catalog ({table: column JSON}) almost never changes between
+# extractions, so it is read once and reused until PRAGMA schema_version moves
+# (the file mtime is not a reliable signal in WAL mode, where commits land in
+# the -wal file). The lock stops concurrent extractions re-reading it in parallel.
+# (schema_version, {table_or_view_name: compact column JSON}, lower-cased names)
+_SCHEMA_CACHE: tuple[int, dict[str, str], frozenset[str]] | None = None
+_schema_lock = threading.Lock()
+
+def _describe_columns(conn: sqlite3.Connection, name: str) -> str:
+    """Compact JSON column list for a table or view, from ``PRAGMA table_info``."""
+    quoted = name.replace('"', '""')
+    columns = []
+    for _cid, col, col_type, notnull, _default, pk in conn.execute(f'PRAGMA table_info("{quoted}")'):
+        entry = {"name": col, "type": col_type or "ANY"}
+        if pk:
+            entry["pk"] = True
+        if notnull:
+            entry["notnull"] = True
+        columns.append(entry)
+    return orjson.dumps({"table": name, "columns": columns}).decode()
+
+def _get_schema_snapshot() -> tuple[int, dict[str, str], frozenset[str]]:
+    """Return the schema version, table/view catalog and name set, cached on the schema version."""
+    global _SCHEMA_CACHE
+    conn = _get_readonly_conn()
+    schema_version = conn.execute("PRAGMA schema_version").fetchone()[0]
+    with _schema_lock:
+        if _SCHEMA_CACHE is not None and _SCHEMA_CACHE[0] == schema_version:
+            return _SCHEMA_CACHE
+
+        # Views are listed alongside tables so the agent can build rules on
+        # them (e.g. v_financial_transactions_enriched). Columns come from
+        # PRAGMA table_info rather than the raw CREATE text, which for
+        # pandas-built tables is long and noisy in the agent's context.
+        names = [
+            name for (name,) in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%'"
+            )
+        ]
+        catalog = {name: _describe_columns(conn, name) for name in names}
+        tables = frozenset(name.lower() for name in catalog)
+        _SCHEMA_CACHE = (schema_version, catalog, tables)
+        return _SCHEMA_CACHE
+
+def _get_catalog() -> dict[str, str]:
+    """Return ``{name: column JSON}`` for user tables and views, cached on the schema version."""
+    return _get_schema_snapshot()[1]
+
+def _invalidate_schema_cache() -> None:
+    """Drop the cached catalog (e.g. after tests or manual schema changes)."""
+    global _SCHEMA_CACHE
+    with _schema_lock:
+        _SCHEMA_CACHE = None
 
 def _list_tables() -> str:
     """Returns a list of tables in the SQLite database."""
-    conn = sqlite3.connect(DB_PATH)
     try:
-        conn.execute("PRAGMA query_only = ON;")
-        cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%'")
-        tables = cursor.fetchall()
-        return json.dumps([t[0] for t in tables])
+        return orjson.dumps(list(_get_catalog())).decode()
     except Exception as e:
         logger.error(f"Failed to list tables: {e}")
-        return json.dumps({"error": str(e)})
-    finally:
-        conn.close()
+        return orjson.dumps({"error": str(e)}).decode()
 
 def _get_table_schema(table_name: str) -> str:
-    """Returns the CREATE TABLE statement for a specific table."""
-    conn = sqlite3.connect(DB_PATH)
+    """Returns the columns of a table or view as compact JSON."""
     try:
-        conn.execute("PRAGMA query_only = ON;")
-        cursor = conn.cursor()
-        cursor.execute("SELECT sql FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
-        row = cursor.fetchone()
-        if row:
-            return row[0]
+        schema = _get_catalog().get(table_name)
+        if schema:
+            return schema
         return f"Table '{table_name}' not found."
     except Exception as e:
         logger.error(f"Failed to get schema for {table_name}: {e}")
         return f"Error: {e}"
-    finally:
-        conn.close()
+
+# Serialised sample_data payloads, valid while PRAGMA data_version (polled on
+# the storage section's sentinel connection) is unchanged — any commit to the
+# DB, data or schema, clears them.
+_SAMPLE_CACHE: dict[str, str] = {}
+_SAMPLE_CACHE_VERSION: int | None = None
+# sample_data is for learning value formats, so long text is cut, BLOBs are
+# replaced by a size marker and whole rows are dropped (keeping at least one)
+# until the payload fits — fewer tokens per agent turn.
+_SAMPLE_MAX_VALUE_CHARS = 200
+_SAMPLE_MAX_PAYLOAD_BYTES = 2048
+
+def _trim_sample_value(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > _SAMPLE_MAX_VALUE_CHARS:
+        return value[:_SAMPLE_MAX_VALUE_CHARS] + "…"
+    if isinstance(value, (bytes, bytearray)):
+        return f"<BLOB {len(value)} bytes>"
+    return value
+
+# Agent-supplied SQL runs under a VM-instruction budget: SQLite polls the
+# progress handler every _VM_PROGRESS_STEP ops and aborts the statement with
+# OperationalError("interrupted") once the budget is spent.
+_VM_PROGRESS_STEP = 1000
+_SAMPLE_MAX_VM_OPS = 1_000_000
+
+def _vm_budget(max_ops: int) -> Callable[[], int]:
+    """Progress handler that returns non-zero (abort) after ~``max_ops`` VM ops."""
+    ticks = 0
+
+    def handler() -> int:
+        nonlocal ticks
+        ticks += 1
+        return ticks * _VM_PROGRESS_STEP > max_ops
+
+    return handler
 
 def _sample_data(table_name: str) -> str:
     """Returns 3 sample rows from a specific table to understand data formats."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
+    global _SAMPLE_CACHE_VERSION
     try:
-        conn.execute("PRAGMA query_only = ON;")
-        cursor = conn.cursor()
-        cursor.execute(f"SELECT * FROM {table_name} LIMIT 3")
-        rows = cursor.fetchall()
-        if rows:
-            return json.dumps([dict(row) for row in rows])
-        return "[]" # Empty table
+        with _cache_lock:
+            version = _data_version()
+            if version != _SAMPLE_CACHE_VERSION:
+                _SAMPLE_CACHE.clear()
+                _SAMPLE_CACHE_VERSION = version
+            cached = _SAMPLE_CACHE.get(table_name)
+        if cached is not None:
+            return cached
+
+        conn = _get_readonly_conn()
+        # table_name comes straight from the model, so "a, b, c" (a cross join)
+        # or a view over an unindexed join would otherwise run unbounded.
+        conn.set_progress_handler(_vm_budget(_SAMPLE_MAX_VM_OPS), _VM_PROGRESS_STEP)
+        try:
+            cursor = conn.execute(f"SELECT * FROM {table_name} LIMIT 3")
+            rows = [
+                {key: _trim_sample_value(row[key]) for key in row.keys()}
+                for row in cursor.fetchall()
+            ]
+        finally:
+            conn.set_progress_handler(None, 0)
+        payload = orjson.dumps(rows) # b"[]" = empty table
+        while len(payload) > _SAMPLE_MAX_PAYLOAD_BYTES and len(rows) > 1:
+            rows.pop()
+            payload = orjson.dumps(rows)
+        result = payload.decode()
+        with _cache_lock:
+            if _SAMPLE_CACHE_VERSION == version:
+                _SAMPLE_CACHE[table_name] = result
+        return result
     except Exception as e:
         logger.error(f"Failed to sample data from {table_name}: {e}")
         return f"Error: {e}"
-    finally:
-        conn.close()
+
+# String literals and comments (group 1 unset), or quoted identifiers (group 1).
+_SQL_LITERAL_OR_COMMENT = re.compile(
+    r"'(?:[^']|'')*'|--[^\n]*|/\*.*?\*/|(\"(?:[^\"]|\"\")*\"|`[^`]*`|\[[^\]]*\])", re.DOTALL
+)
+_NON_WORD = re.compile(r"\W")
+_SQL_IDENT = r'([A-Za-z_]\w*|"[^"]+"|`[^`]+`|\[[^\]]+\])'
+# Table referenced by FROM/JOIN; a trailing '.' or '(' (schema-qualified name or
+# table-valued function) is captured so those can be left to SQLite, as is the
+# DISTINCT of an ``IS [NOT] DISTINCT FROM`` comparison.
+_SQL_FROM_TABLE = re.compile(r"\b(DISTINCT\s+)?(?:FROM|JOIN)\s+" + _SQL_IDENT + r"(\s*[.(])?", re.IGNORECASE)
+_SQL_CTE_NAME = re.compile(r"(?:\bWITH(?:\s+RECURSIVE)?|,)\s*" + _SQL_IDENT + r"\s*(?:\([^)]*\))?\s+AS\s*\(", re.IGNORECASE)
+
+def _mask_sql_token(match: re.Match) -> str:
+    """
+    Blank out a literal/comment; keep a quoted identifier but with its non-word
+    characters replaced, so words inside it (``"Join Date"``, ``"amount from
+    card"``) can't read as a FROM/JOIN clause.
+    """
+    quoted = match.group(1)
+    if quoted is None:
+        return "''"
+    return quoted[0] + _NON_WORD.sub("_", quoted[1:-1]) + quoted[-1]
+
+def _find_unknown_table(query: str, known_tables: frozenset[str]) -> str | None:
+    """
+    Cheap pre-check for the agent's most common mistake: a hallucinated table.
+    Returns the first FROM/JOIN table that is neither in the schema nor a CTE,
+    or None. Anything it can't judge confidently is left for SQLite to compile.
+    """
+    text = _SQL_LITERAL_OR_COMMENT.sub(_mask_sql_token, query)
+    ctes = {name.strip('"`[]').lower() for name in _SQL_CTE_NAME.findall(text)}
+    for distinct, name, qualifier in _SQL_FROM_TABLE.findall(text):
+        if distinct or qualifier or name[0] in '"`[':
+            continue  # quoted table names are left to SQLite as well
+        table = name.strip('"`[]')
+        lowered = table.lower()
+        if lowered in known_tables or lowered in ctes or lowered.startswith("sqlite_"):
+            continue
+        return table
+    return None
 
 def _validate_sql_locally(query: str) -> str:
-    """Executes EXPLAIN QUERY PLAN or LIMIT 0 to validate syntax against the real DB in read-only mode."""
-    if not query.strip().upper().startswith("SELECT"):
+    """Compiles the query with EXPLAIN against the real DB in read-only mode, without producing rows."""
+    if query.lstrip()[:6].upper() != "SELECT":
         return "Error: Query must be a SELECT statement."
-    
-    conn = sqlite3.connect(DB_PATH)
+
     try:
-        # Prevent DROP/DELETE/INSERT dynamically
-        conn.execute("PRAGMA query_only = ON;")
-        cursor = conn.cursor()
-        
-        # We only want to validate, not fetch massive data, so wrap in LIMIT 0
-        test_query = f"SELECT * FROM ({query}) LIMIT 0"
-        cursor.execute(test_query)
+        schema_version, _, known_tables = _get_schema_snapshot()
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+    unknown_table = _find_unknown_table(query, known_tables)
+    if unknown_table is not None:
+        return f"Error: SQLite OperationalError: no such table: {unknown_table}"
+    return _validate_sql_cached(query, schema_version)
+
+@functools.lru_cache(maxsize=512)
+def _validate_sql_cached(query: str, schema_version: int) -> str:
+    """
+    Memoised on the exact query text plus the schema version, so the agent
+    re-testing a query it already tried never touches SQLite.
+    """
+    try:
+        # EXPLAIN only prepares the statement: syntax and unknown table/column
+        # errors surface at compile time, and no rows are ever produced. The query
+        # is still wrapped as a subquery because that is how the compliance
+        # monitor executes rules (e.g. a trailing ';' must fail here too).
+        _get_readonly_conn().execute(f"EXPLAIN SELECT * FROM ({query}) LIMIT 0")
         return "Success: The SQL query is valid."
     except sqlite3.OperationalError as e:
         return f"Error: SQLite OperationalError: {str(e)}"
     except Exception as e:
         return f"Error: {str(e)}"
-    finally:
-        conn.close()
 
-def extract_rules_from_document(pdf_path: str, policy_name: str) -> list[dict]:
+def _validate_sql_dedup(query: str, validation_cache: dict | None) -> str:
     """
-    Enterprise-Grade Agentic Extraction using Gemini 1.5 Pro.
-    Features:
-    - Exploratory DB tools (list tables, get schemas, sample data)
-    - Safe SQL execution (PRAGMA query_only=ON)
-    - Chain-of-Thought reasoning
+    Validate ``query`` through a per-extraction memo, so the agent re-testing a
+    query (even re-indented) within one extraction is a dict lookup. Whitespace
+    is only collapsed when there is no ``--`` comment, whose extent depends on
+    line breaks.
     """
-    if not os.path.exists(pdf_path):
-        logger.error(f"Policy document not found at {pdf_path}")
-        return []
-        
-    import vertexai
-    from vertexai.generative_models import GenerativeModel, Tool, FunctionDeclaration, Part
-    
-    # Read the raw PDF bytes
+    if validation_cache is None:
+        return _validate_sql_locally(query)
+    key = query if "--" in query else " ".join(query.split())
+    result = validation_cache.get(key)
+    if result is None:
+        result = validation_cache[key] = _validate_sql_locally(query)
+    return result
+
+def _validate_sql_batch(queries: list[str], validation_cache: dict | None = None) -> str:
+    """Validates several candidate queries in one tool call; returns a JSON list of {query, result}."""
+    return orjson.dumps([
+        {"query": query, "result": _validate_sql_dedup(query, validation_cache)}
+        for query in queries
+    ]).decode()
+
+# Keys every extracted rule must carry to be executable by the compliance monitor.
+_REQUIRED_RULE_KEYS = ("rule_id", "sql_query", "severity")
+_json_decoder = json.JSONDecoder()
+# A final answer wrapped in a Markdown code fence (```json ... ```), whitespace-tolerant.
+_JSON_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL | re.IGNORECASE)
+
+def _is_valid_rule(obj: Any) -> bool:
+    return isinstance(obj, dict) and all(
+        isinstance(obj.get(key), str) and obj.get(key) for key in _REQUIRED_RULE_KEYS
+    )
+
+def _salvage_rule_objects(text: str) -> list[dict]:
+    """Recover every complete JSON object from malformed/truncated output via raw_decode."""
+    objects = []
+    idx = text.find("{")
+    while idx != -1:
+        try:
+            obj, end = _json_decoder.raw_decode(text, idx)
+        except json.JSONDecodeError:
+            idx = text.find("{", idx + 1)
+            continue
+        objects.append(obj)
+        idx = text.find("{", end)
+    return objects
+
+def _decode_first_array(text: str) -> list | None:
+    """
+    Decode the first complete JSON array of objects in ``text`` with raw_decode,
+    scanning forward from each '[' (tolerates surrounding prose and stray ']').
+    """
+    idx = text.find("[")
+    while idx != -1:
+        try:
+            obj, _ = _json_decoder.raw_decode(text, idx)
+        except json.JSONDecodeError:
+            obj = None
+        if isinstance(obj, list) and all(isinstance(item, dict) for item in obj):
+            return obj
+        idx = text.find("[", idx + 1)
+    return None
+
+def _parse_rules(text: str) -> list[dict]:
+    """
+    Strictly parse the agent's final answer into rule dicts.
+    Falls back to the first JSON array embedded in surrounding text, then to
+    salvaging individual rule objects when the array itself is malformed, and
+    drops objects missing required keys. Raises ValueError when
+    nothing usable remains, so the caller can ask the model to retry.
+    """
+    fenced = _JSON_FENCE_RE.match(text)
+    if fenced:
+        text = fenced.group(1)
+    try:
+        parsed = orjson.loads(text)
+    except orjson.JSONDecodeError as e:
+        parsed = _decode_first_array(text)
+        if parsed is None:
+            parsed = _salvage_rule_objects(text)
+            if not parsed:
+                raise ValueError(f"Invalid JSON: {e}") from e
+            logger.warning(f"Salvaged {len(parsed)} JSON object(s) from malformed agent output.")
+
+    if isinstance(parsed, dict):
+        parsed = [parsed]
+    if not isinstance(parsed, list):
+        raise ValueError("Expected a JSON array of rule objects.")
+    if not parsed:
+        raise ValueError("The JSON array is empty; it must contain the extracted rules.")
+
+    rules = [obj for obj in parsed if _is_valid_rule(obj)]
+    if len(rules) < len(parsed):
+        logger.warning(f"Dropped {len(parsed) - len(rules)} rule(s) missing one of {_REQUIRED_RULE_KEYS}.")
+        if not rules:
+            raise ValueError(f"No rule object contained all required keys {_REQUIRED_RULE_KEYS}.")
+    return rules
+
+# Anything smaller than this cannot hold a PDF with extractable policy text.
+_MIN_PDF_BYTES = 64
+# The %PDF- header may sit anywhere in the first 1024 bytes (as pypdf/Acrobat allow).
+_PDF_HEADER_SEARCH_BYTES = 1024
+# Inline request payloads to Gemini are capped (~20 MB); larger PDFs fail slowly
+# server-side, so reject them up front. Overridable via POLICY_MAX_PDF_BYTES.
+_DEFAULT_MAX_POLICY_PDF_BYTES = 20 * 1024 * 1024
+# Upper bound on a single tool result sent back to the model, to keep each
+# agent turn's context (and latency) bounded.
+MAX_TOOL_RESULT_CHARS = 8000
+
+def _skip_extraction_reason(pdf_path: str) -> str | None:
+    """
+    Cheap rule-based gate run before invoking Gemini. Returns a reason string
+    when the document cannot yield rules (so the LLM call is skipped), else None.
+    """
+    max_bytes = _cfg().max_pdf_bytes
+    size = os.path.getsize(pdf_path)
+    if size < _MIN_PDF_BYTES:
+        return f"document is only {size} bytes"
+    if size > max_bytes:
+        return f"document is {size} bytes, above the {max_bytes}-byte limit"
     with open(pdf_path, "rb") as f:
-        pdf_content = f.read()
-        
-    document_part = Part.from_data(pdf_content, mime_type="application/pdf")
-    
+        # Readers accept leading junk before the header, within the first 1 KiB
+        if b"%PDF-" not in f.read(_PDF_HEADER_SEARCH_BYTES):
+            return "file is not a PDF (missing %PDF- header)"
+    return None
+
+# The system instruction, Tool and GenerativeModel are pure configuration, so
+# they are built once and reused: GenerativeModel is stateless (every extraction
+# keeps its own turn history), which makes sharing safe.
+_AGENT_SYSTEM_INSTRUCTION = '''
+You are an expert Compliance Data Engineer. Your goal is to convert a human-readable policy document into executable SQL rules for a SQLite database.
+
+**INSTRUCTIONS:**
+1. **Explore:** You don't know the DB schema yet. Use `list_tables`, `get_table_schema`, and `sample_data` to explore the database and find relevant tables and exact data values to match against.
+2. **Identify:** Find all distinct compliance rules in the document.
+3. **Formulate & Test:** For each rule, formulate a SQL query that selects the VIOLATING records (a resulting row means a violation). You MUST use the `validate_sql` tool to test your queries. Prefer `validate_sql_batch` when testing multiple queries at once. Adjust query if it fails.
+4. **Final Output Format:** Once all queries are successfully validated, output the final rules as a JSON array of objects. Do not use markdown wrappers, just raw JSON.
+
+**SCHEMA FOR FINAL JSON ARRAY ITEMS:**
+{
+  "rule_id": "EXP-001",
+  "description": "Human readable description",
+  "quote": "Exact policy text",
+  "chain_of_thought": "My reasoning for this SQL logic...",
+  "sql_query": "SELECT * FROM ...",
+  "severity": "HIGH", "MEDIUM", or "LOW"
+}
+'''
+
+# Opening user message, sent after the document Part; only the title varies.
+_EXTRACTION_PROMPT_TEMPLATE = (
+    "POLICY DOCUMENT TITLE: {policy_name}\n\n"
+    "Please read the attached policy document carefully, explore the DB, identify violations, "
+    "test queries, and output the final JSON array of rules."
+)
+
+_VERTEX_MODULES: dict[str, Any] | None = None
+_vertex_import_lock = threading.Lock()
+
+def _ensure_vertex_loaded() -> dict[str, Any]:
+    """Import vertexai and the generative_models classes once, returning them by name."""
+    global _VERTEX_MODULES
+    if _VERTEX_MODULES is not None:
+        return _VERTEX_MODULES
+    with _vertex_import_lock:
+        if _VERTEX_MODULES is None:
+            import vertexai
+            from vertexai.generative_models import (
+                Content, FunctionDeclaration, GenerativeModel, Part, Tool,
+            )
+            _VERTEX_MODULES = {
+                "vertexai": vertexai,
+                "Content": Content,
+                "FunctionDeclaration": FunctionDeclaration,
+                "GenerativeModel": GenerativeModel,
+                "Part": Part,
+                "Tool": Tool,
+            }
+    return _VERTEX_MODULES
+
+def _prewarm_vertex() -> None:
     try:
-        vertexai.init(project=project_id, location=location)
+        init_vertex()
+        _get_agent_model(_cfg().model_name)
+        logger.info("Vertex AI SDK preloaded and initialised.")
     except Exception as e:
-        logger.warning(f"Vertex AI init failed: {e}")
-        
-    model_name = os.getenv("GEMINI_MODEL_NAME", "gemini-1.5-pro")
-    
-    # 1. Define the Tools for DB Exploration and Validation
+        logger.warning(f"Vertex AI SDK preload failed: {e}")
+
+def prewarm_vertex_in_background() -> None:
+    """
+    Import and initialise vertexai and build the default agent model on a daemon
+    thread, so that work overlaps server startup. A request arriving earlier
+    simply waits on the same import/init locks instead of repeating it.
+    """
+    threading.Thread(target=_prewarm_vertex, name="vertex-prewarm", daemon=True).start()
+
+def _map_file(path: str) -> mmap.mmap:
+    """Map ``path`` read-only: pages are served from the kernel page cache on demand, not copied to the heap."""
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+@functools.lru_cache(maxsize=1)
+def _agent_tools():
+    """Build the DB exploration/validation Tool once (behind a factory to keep vertexai lazy)."""
+    vertex = _ensure_vertex_loaded()
+    Tool, FunctionDeclaration = vertex["Tool"], vertex["FunctionDeclaration"]
+
+    # Define the Tools for DB Exploration and Validation
     list_tables_func = FunctionDeclaration(
         name="list_tables",
-        description="Returns a list of all tables in the SQLite database.",
+        description="Returns a list of all tables and views in the SQLite database.",
         parameters={"type": "object", "properties": {}}
     )
     get_schema_func = FunctionDeclaration(
         name="get_table_schema",
-        description="Returns the CREATE TABLE statement for a specific table so you can see its columns.",
+        description="Returns the columns (name, type, primary key / NOT NULL flags) of a table or view as JSON.",
         parameters={
             "type": "object",
             "properties": {"table_name": {"type": "string"}},
@@ -158,114 +581,417 @@ def extract_rules_from_document(pdf_path: str, policy_name: str) -> list[dict]:
             "required": ["query"]
         }
     )
+    validate_sql_batch_func = FunctionDeclaration(
+        name="validate_sql_batch",
+        description="Validates several SELECT SQL queries in one call. Returns a JSON list of {query, result} objects, where each result is 'Success' or the SQLite error message. Prefer this over repeated validate_sql calls when testing multiple queries.",
+        parameters={
+            "type": "object",
+            "properties": {
+                "queries": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "The SQL SELECT queries to test. Each must find policy violations (where a result row means a rule was broken)."
+                }
+            },
+            "required": ["queries"]
+        }
+    )
     
-    agent_tools = Tool(function_declarations=[
-        list_tables_func, get_schema_func, sample_data_func, validate_sql_func
+    return Tool(function_declarations=[
+        list_tables_func, get_schema_func, sample_data_func, validate_sql_func, validate_sql_batch_func
     ])
 
-    # 2. Initialize Model with System Instructions
-    system_instruction = '''
-You are an expert Compliance Data Engineer. Your goal is to convert a human-readable policy document into executable SQL rules for a SQLite database.
+@functools.lru_cache(maxsize=4)
+def _get_agent_model(model_name: str):
+    """Return the agent GenerativeModel for ``model_name``, built once and reused."""
+    GenerativeModel = _ensure_vertex_loaded()["GenerativeModel"]
 
-**INSTRUCTIONS:**
-1. **Explore:** You don't know the DB schema yet. Use `list_tables`, `get_table_schema`, and `sample_data` to explore the database and find relevant tables and exact data values to match against.
-2. **Identify:** Find all distinct compliance rules in the document.
-3. **Formulate & Test:** For each rule, formulate a SQL query that selects the VIOLATING records (a resulting row means a violation). You MUST use the `validate_sql` tool to test your queries. Adjust query if it fails.
-4. **Final Output Format:** Once all queries are successfully validated, output the final rules as a JSON array of objects. Do not use markdown wrappers, just raw JSON.
-
-**SCHEMA FOR FINAL JSON ARRAY ITEMS:**
-{
-  "rule_id": "EXP-001",
-  "description": "Human readable description",
-  "quote": "Exact policy text",
-  "chain_of_thought": "My reasoning for this SQL logic...",
-  "sql_query": "SELECT * FROM ...",
-  "severity": "HIGH", "MEDIUM", or "LOW"
-}
-'''
-    
-    model = GenerativeModel(
+    return GenerativeModel(
         model_name,
-        system_instruction=system_instruction,
-        tools=[agent_tools],
+        system_instruction=_AGENT_SYSTEM_INSTRUCTION,
+        tools=[_agent_tools()],
         # Explicitly request JSON output as a Structured Output constraint
         generation_config={"response_mime_type": "application/json"}
     )
 
-    chat = model.start_chat()
+# Agentic Loop: Handle Tool calls up to 15 times to allow deep exploration
+_MAX_AGENT_TURNS = 15
+# Tool-response turns older than the last few are re-sent with compacted results
+# so the history we resend each turn doesn't keep every full sample/schema dump.
+_FULL_TOOL_TURNS = 5
+_COMPACT_TOOL_RESULT_CHARS = 200
+
+# Tool calls from one turn are independent reads, so they run concurrently.
+# Each worker thread gets its own pooled read-only connection via _conn_local.
+_TOOL_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="agent-tool")
+
+# Exploration tools whose answer can't change within one extraction; a repeat
+# is answered from the session memo, with a note steering the model onward
+# instead of spending another turn re-reading the same schema.
+_MEMOISED_TOOLS = frozenset({"list_tables", "get_table_schema", "sample_data"})
+_REPEATED_TOOL_NOTE = (
+    "\n[Note: you already made this exact call earlier; this is the same result. "
+    "Use it and move on to writing or validating SQL.]"
+)
+
+def _dispatch_tool(function_call, tool_cache: dict | None = None) -> tuple[str, str]:
+    """
+    Execute a single tool call and return its ``(name, result)`` pair.
+    ``tool_cache`` is the extraction session's memo: it holds validate_sql
+    results and answers repeated exploration calls without re-running them.
+    """
+    func_name = function_call.name
+    args = {k: v for k,v in function_call.args.items()}
+    
+    memo_key = None
+    if tool_cache is not None and func_name in _MEMOISED_TOOLS:
+        memo_key = (func_name, tuple(sorted((k, str(v)) for k, v in args.items())))
+        seen = tool_cache.get(memo_key)
+        if seen is not None:
+            logger.info(f"Agent repeated tool: {func_name} with args: {args}")
+            return func_name, seen + _REPEATED_TOOL_NOTE
+
+    logger.info(f"Agent using tool: {func_name} with args: {args}")
+    
+    result = ""
+    if func_name == "list_tables":
+        result = _list_tables()
+    elif func_name == "get_table_schema":
+        result = _get_table_schema(args.get("table_name", ""))
+    elif func_name == "sample_data":
+        result = _sample_data(args.get("table_name", ""))
+    elif func_name == "validate_sql":
+        result = _validate_sql_dedup(args.get("query", ""), tool_cache)
+    elif func_name == "validate_sql_batch":
+        result = _validate_sql_batch([str(q) for q in args.get("queries", [])], tool_cache)
+
+    if len(result) > MAX_TOOL_RESULT_CHARS:
+        result = result[:MAX_TOOL_RESULT_CHARS] + "... [truncated]"
+    if memo_key is not None:
+        tool_cache[memo_key] = result
     
-    prompt = f"POLICY DOCUMENT TITLE: {policy_name}\n\nPlease read the attached policy document carefully, explore the DB, identify violations, test queries, and output the final JSON array of rules."
+    # Truncate result for logging
+    trunc_result = str(result)[:100] + "..." if len(str(result)) > 100 else str(result)
+    logger.info(f"Tool {func_name} result: {trunc_result}")
+    
+    return func_name, result
+
+def _run_tool_calls(function_calls, tool_cache: dict | None = None) -> list[tuple[str, str]]:
+    """Execute one turn's tool calls (concurrently when there are several) and return their ``(name, result)`` pairs in call order."""
+    if len(function_calls) == 1:
+        return [_dispatch_tool(function_calls[0], tool_cache)]
+    return list(_TOOL_EXECUTOR.map(
+        lambda function_call: _dispatch_tool(function_call, tool_cache), function_calls
+    ))
+
+def _tool_response_content(tool_results: list[tuple[str, str]], max_chars: int = MAX_TOOL_RESULT_CHARS):
+    """Wrap tool results as the user turn answering the model's function calls."""
+    vertex = _ensure_vertex_loaded()
+    Part, Content = vertex["Part"], vertex["Content"]
+
+    parts = []
+    for name, result in tool_results:
+        if len(result) > max_chars:
+            result = result[:max_chars] + "... [truncated]"
+        parts.append(Part.from_function_response(name=name, response={"result": result}))
+    return Content(role="user", parts=parts)
+
+def _turn_content(response):
+    """The model Content of one ``generate_content`` response (empty if it has no candidates)."""
+    if response.candidates:
+        return response.candidates[0].content
+    vertex = _ensure_vertex_loaded()
+    return vertex["Content"](role="model", parts=[])
+
+# Upper bound on one Gemini turn in the async path, so a stalled call fails
+# the extraction instead of holding it open indefinitely.
+_DEFAULT_AGENT_TURN_TIMEOUT_SECONDS = 60.0
+
+async def _model_turn_async(model, history: list):
+    """Run one async model turn, bounded by AGENT_TURN_TIMEOUT_SECONDS."""
+    timeout = _cfg().turn_timeout
+    try:
+        response = await asyncio.wait_for(model.generate_content_async(history), timeout=timeout)
+    except asyncio.TimeoutError:
+        raise TimeoutError(f"Gemini turn timed out after {timeout:g}s")
+    return _turn_content(response)
+
+def _append_turn(history: list, tool_turns: list, model_content, next_message) -> None:
+    """
+    Record the model's turn and our reply in ``history``. Once there are more
+    than _FULL_TOOL_TURNS tool turns, the oldest full one is replaced with a
+    compacted copy (``tool_turns`` tracks their history indexes).
+    """
+    vertex = _ensure_vertex_loaded()
+    history.append(model_content)
+
+    if isinstance(next_message, str):
+        history.append(vertex["Content"](role="user", parts=[vertex["Part"].from_text(next_message)]))
+        return
+
+    tool_turns.append((len(history), next_message))
+    history.append(_tool_response_content(next_message))
+    if len(tool_turns) > _FULL_TOOL_TURNS:
+        index, results = tool_turns[-_FULL_TOOL_TURNS - 1]
+        history[index] = _tool_response_content(results, _COMPACT_TOOL_RESULT_CHARS)
+
+def _split_model_parts(model_content) -> tuple[list, str]:
+    """Walk a model turn's parts once, returning its function calls and its joined text."""
+    function_calls = []
+    text_parts = []
+    for part in model_content.parts:
+        if part.function_call:
+            function_calls.append(part.function_call)
+        else:
+            text = getattr(part, "text", "")
+            if text:
+                text_parts.append(text)
+    return function_calls, "".join(text_parts)
+
+def _agent_step(model_content, tool_cache: dict | None = None) -> tuple[list[dict] | None, Any]:
+    """
+    Process one model turn. Returns ``(rules, None)`` once the final JSON
+    parses, otherwise ``(None, next_message)`` to send back to the model:
+    the ``(name, result)`` tool results, or a retry prompt string.
+    """
+    function_calls, text = _split_model_parts(model_content)
+    
+    if function_calls:
+        # All tool responses go back in one turn
+        return None, _run_tool_calls(function_calls, tool_cache)
+
+    # No function calls, expecting final JSON payload
+    text_resp = text.strip()
+    if not text_resp:
+        logger.warning("Agent returned empty text. Prompting to retry.")
+        return None, "Error: Empty response. Return the final JSON array."
+        
+    try:
+        parsed_json = _parse_rules(text_resp)
+        logger.info("Agent successfully output valid JSON rules.")
+        return parsed_json, None
+    except ValueError as e:
+        logger.warning(f"JSON parsing failed. Forcing retry. Error: {e}")
+        return None, f"Your output was not valid JSON. Error: {e}. Output ONLY raw JSON array without markdown blocks."
+
+# Extraction results are cached on disk, keyed on the PDF content, policy name,
+# model and DB schema (rule SQL depends on the schema shape), so re-uploading
+# the same document skips the whole agent loop. Kept in its own SQLite file so
+# cache writes neither show up in the agent's catalog nor bump the company
+# DB's data_version. An empty EXTRACTION_CACHE_PATH disables the cache;
+# EXTRACTION_CACHE_TTL_SECONDS sets the entry lifetime (default 7 days).
+_DEFAULT_EXTRACTION_CACHE_TTL_SECONDS = 7 * 24 * 3600
+
+def _extraction_cache_path() -> str:
+    return _cfg().extraction_cache_path
+def _get_extraction_cache_conn() -> sqlite3.Connection:
+    """Return this thread's pooled connection to the extraction cache DB."""
+    conn = getattr(_conn_local, "cache", None)
+    if conn is None:
+        conn = sqlite3.connect(_extraction_cache_path(), check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS extraction_cache (
+                key        TEXT PRIMARY KEY,
+                rules      BLOB NOT NULL,
+                created_at REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        with _pool_lock:
+            _pooled_conns.append(conn)
+        _conn_local.cache = conn
+    return conn
+
+def _extraction_cache_key(pdf_sha: str, policy_name: str, model_name: str) -> str:
+    catalog = _get_catalog()
+    schema_hash = hashlib.sha256(
+        "\n".join(f"{name}:{catalog[name]}" for name in sorted(catalog)).encode()
+    ).hexdigest()
+    policy_sha = hashlib.sha256(policy_name.encode()).hexdigest()
+    return f"{pdf_sha}:{policy_sha}:{model_name}:{schema_hash}"
+
+# Recently built document Parts keyed on the PDF's sha256, so re-submitting a
+# document whose extraction failed (failures aren't in the extraction cache)
+# or with another policy name/model skips the copy and Part construction.
+# Uploads land at a fresh temp path each time, hence content- not path-keyed.
+# Kept small: each entry holds a full PDF (up to POLICY_MAX_PDF_BYTES).
+_PDF_PART_CACHE_SIZE = 4
+_PDF_PART_CACHE: OrderedDict[str, Any] = OrderedDict()
+_pdf_part_lock = threading.Lock()
+
+def _get_pdf_part(pdf_sha: str, pdf_map: mmap.mmap):
+    """Return the document Part for ``pdf_sha``, building it from the mapping on a miss."""
+    with _pdf_part_lock:
+        part = _PDF_PART_CACHE.get(pdf_sha)
+        if part is not None:
+            _PDF_PART_CACHE.move_to_end(pdf_sha)
+            return part
+
+    part = _ensure_vertex_loaded()["Part"].from_data(pdf_map[:], mime_type="application/pdf")
+    with _pdf_part_lock:
+        _PDF_PART_CACHE[pdf_sha] = part
+        while len(_PDF_PART_CACHE) > _PDF_PART_CACHE_SIZE:
+            _PDF_PART_CACHE.popitem(last=False)
+    return part
+
+def _load_cached_rules(key: str) -> list[dict] | None:
+    """Return the cached rules for ``key`` if present and fresh, else None."""
+    if not _extraction_cache_path():
+        return None
+    ttl = _cfg().extraction_cache_ttl
+    try:
+        row = _get_extraction_cache_conn().execute(
+            "SELECT rules FROM extraction_cache WHERE key = ? AND created_at >= ?",
+            (key, time.time() - ttl),
+        ).fetchone()
+        rules = orjson.loads(row[0]) if row else None
+        # Entries written before empty results stopped being cached count as misses
+        return rules or None
+    except Exception as e:
+        logger.warning(f"Extraction cache read failed: {e}")
+        return None
+
+def _store_cached_rules(key: str, rules: list[dict]) -> None:
+    """Cache a successful extraction; empty results are never cached, so they get retried."""
+    if not rules or not _extraction_cache_path():
+        return
+    try:
+        with _get_extraction_cache_conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO extraction_cache (key, rules, created_at) VALUES (?, ?, ?)",
+                (key, orjson.dumps(rules), time.time()),
+            )
+    except Exception as e:
+        logger.warning(f"Extraction cache write failed: {e}")
+
+def _prepare_extraction(pdf_path: str, policy_name: str, model_name: str | None):
+    """
+    Pre-check the document, read it and initialise Vertex AI.
+    Returns ``(cache_key, cached_rules, model, first_content)`` — on a cache hit
+    ``cached_rules`` is set and the model is not built — or None when
+    extraction should be skipped.
+    """
+    _ensure_env()
+    if not os.path.exists(pdf_path):
+        logger.error(f"Policy document not found at {pdf_path}")
+        return None
+
+    skip_reason = _skip_extraction_reason(pdf_path)
+    if skip_reason:
+        logger.warning(f"Skipping LLM extraction for '{policy_name}': {skip_reason}.")
+        return None
+    logger.info(f"Pre-check passed for '{policy_name}'; invoking Gemini extraction.")
+
+    model_name = model_name or _cfg().model_name
+
+    # The PDF is memory-mapped: the cache key is hashed straight from the page
+    # cache, so a cache hit never copies the document into the heap. Only on a
+    # miss is it copied once, into the Part the SDK requires bytes for.
+    pdf_map = _map_file(pdf_path)
+    try:
+        pdf_sha = hashlib.sha256(pdf_map).hexdigest()
+        cache_key = _extraction_cache_key(pdf_sha, policy_name, model_name)
+        cached_rules = _load_cached_rules(cache_key)
+        if cached_rules is not None:
+            logger.info(f"Extraction cache hit for '{policy_name}' ({len(cached_rules)} rules).")
+            return cache_key, cached_rules, None, None
+
+        # Build the document Part while vertexai is initialised — the two are
+        # independent, so the copy overlaps the SDK's network/auth setup.
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            init_future = pool.submit(init_vertex)
+            vertex = _ensure_vertex_loaded()
+            Part, Content = vertex["Part"], vertex["Content"]
+            document_part = _get_pdf_part(pdf_sha, pdf_map)
+            try:
+                init_future.result()
+            except Exception as e:
+                logger.warning(f"Vertex AI init failed: {e}")
+    finally:
+        pdf_map.close()
+    
+    model = _get_agent_model(model_name)
+    
+    prompt = _EXTRACTION_PROMPT_TEMPLATE.format(policy_name=policy_name)
+    return cache_key, None, model, Content(role="user", parts=[document_part, Part.from_text(prompt)])
+
+def extract_rules_from_document(
+    pdf_path: str,
+    policy_name: str,
+    model_name: str | None = None,
+) -> list[dict]:
+    """
+    Enterprise-Grade Agentic Extraction using Gemini 1.5 Pro.
+    ``model_name`` overrides the GEMINI_MODEL_NAME env default.
+    Features:
+    - Exploratory DB tools (list tables, get schemas, sample data)
+    - Safe SQL execution (read-only connection)
+    - Chain-of-Thought reasoning
+    """
+    prepared = _prepare_extraction(pdf_path, policy_name, model_name)
+    if prepared is None:
+        return []
+    cache_key, cached_rules, model, first_content = prepared
+    if cached_rules is not None:
+        return cached_rules
+    # History is kept here and passed to generate_content each turn rather than
+    # through a ChatSession, so old tool responses can be compacted in place.
+    history = [first_content]
+    tool_turns: list[tuple[int, list[tuple[str, str]]]] = []
+    tool_cache: dict = {}
     
     try:
         logger.info(f"Starting Enterprise Agentic Extraction for: {policy_name}")
-        response = chat.send_message([document_part, prompt])
+        model_content = _turn_content(model.generate_content(history))
+        
+        for _ in range(_MAX_AGENT_TURNS):
+            rules, next_message = _agent_step(model_content, tool_cache)
+            if rules is not None:
+                _store_cached_rules(cache_key, rules)
+                return rules
+            _append_turn(history, tool_turns, model_content, next_message)
+            model_content = _turn_content(model.generate_content(history))
+
+        logger.warning("Agentic exploration exceeded max turns.")
+        raise ValueError("Agent failed to output valid JSON rules after time limit.")
+        
+    except Exception as e:
+        logger.error(f"Agentic rule extraction failed: {e}")
+        raise ValueError(f"Failed to extract rules from document: {e}")
+
+async def extract_rules_from_document_async(
+    pdf_path: str,
+    policy_name: str,
+    model_name: str | None = None,
+) -> list[dict]:
+    """
+    Async variant of :func:`extract_rules_from_document` for event-loop callers.
+    Each Gemini turn is awaited via ``generate_content_async`` so the worker is free
+    to serve other requests (or other extractions) while waiting on the network.
+    """
+    prepared = await asyncio.to_thread(_prepare_extraction, pdf_path, policy_name, model_name)
+    if prepared is None:
+        return []
+    cache_key, cached_rules, model, first_content = prepared
+    if cached_rules is not None:
+        return cached_rules
+    history = [first_content]
+    tool_turns: list[tuple[int, list[tuple[str, str]]]] = []
+    tool_cache: dict = {}
+    
+    try:
+        logger.info(f"Starting Enterprise Agentic Extraction (async) for: {policy_name}")
+        model_content = await _model_turn_async(model, history)
         
-        # Agentic Loop: Handle Tool calls up to 15 times to allow deep exploration
-        max_turns = 15
-        turns = 0
-        while turns < max_turns:
-            
-            def get_function_calls(resp):
-                if not resp.candidates: return []
-                fc_list = []
-                for part in resp.candidates[0].content.parts:
-                    if part.function_call:
-                        fc_list.append(part.function_call)
-                return fc_list
-                
-            function_calls = get_function_calls(response)
-            
-            if function_calls:
-                tool_responses = []
-                for function_call in function_calls:
-                    func_name = function_call.name
-                    args = {k: v for k,v in function_call.args.items()}
-                    
-                    logger.info(f"Agent using tool: {func_name} with args: {args}")
-                    
-                    result = ""
-                    if func_name == "list_tables":
-                        result = _list_tables()
-                    elif func_name == "get_table_schema":
-                        result = _get_table_schema(args.get("table_name", ""))
-                    elif func_name == "sample_data":
-                        result = _sample_data(args.get("table_name", ""))
-                    elif func_name == "validate_sql":
-                        result = _validate_sql_locally(args.get("query", ""))
-                    
-                    # Truncate result for logging
-                    trunc_result = str(result)[:100] + "..." if len(str(result)) > 100 else str(result)
-                    logger.info(f"Tool {func_name} result: {trunc_result}")
-                    
-                    tool_responses.append(
-                        Part.from_function_response(
-                            name=func_name,
-                            response={"result": result}
-                        )
-                    )
-                
-                # Send all tool responses back in one turn
-                response = chat.send_message(tool_responses)
-            else:
-                # No function calls, expecting final JSON payload
-                text_resp = response.text.strip()
-                if not text_resp:
-                    logger.warning("Agent returned empty text. Prompting to retry.")
-                    response = chat.send_message("Error: Empty response. Return the final JSON array.")
-                    turns += 1
-                    continue
-                    
-                try:
-                    parsed_json = json.loads(text_resp)
-                    logger.info("Agent successfully output valid JSON rules.")
-                    return parsed_json
-                except json.JSONDecodeError as e:
-                    logger.warning(f"JSON parsing failed. Forcing retry. Error: {e}")
-                    response = chat.send_message(
-                        f"Your output was not valid JSON. Error: {e}. Output ONLY raw JSON array without markdown blocks."
-                    )
-            
-            turns += 1
+        for _ in range(_MAX_AGENT_TURNS):
+            # Tool calls hit SQLite; run them (and the JSON parse) off the event loop
+            rules, next_message = await asyncio.to_thread(_agent_step, model_content, tool_cache)
+            if rules is not None:
+                await asyncio.to_thread(_store_cached_rules, cache_key, rules)
+                return rules
+            _append_turn(history, tool_turns, model_content, next_message)
+            model_content = await _model_turn_async(model, history)
 
         logger.warning("Agentic exploration exceeded max turns.")
         raise ValueError("Agent failed to output valid JSON rules after time limit.")
@@ -274,84 +1000,176 @@ You are an expert Compliance Data Engineer. Your goal is to convert a human-read
         logger.error(f"Agentic rule extraction failed: {e}")
         raise ValueError(f"Failed to extract rules from document: {e}")
 
+async def extract_rules_batch(documents: list[tuple[str, str]], concurrency: int = 4) -> list:
+    """
+    Extract rules from several ``(pdf_path, policy_name)`` documents concurrently,
+    at most ``concurrency`` at a time. Results are returned in input order; a
+    failed extraction yields its exception instead of cancelling the others.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _extract_one(pdf_path: str, policy_name: str) -> list[dict]:
+        async with semaphore:
+            return await extract_rules_from_document_async(pdf_path, policy_name)
+
+    return await asyncio.gather(
+        *(_extract_one(pdf_path, policy_name) for pdf_path, policy_name in documents),
+        return_exceptions=True,
+    )
+
         
 # ---------------------------------------------------------------------------
 # Policy Storage — SQLite-backed (persists across restarts)
 # ---------------------------------------------------------------------------
 
-def _get_conn() -> sqlite3.Connection:
-    """Return a connection to the shared company_data.db."""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    return conn
+# Statement text is kept in module constants so every call passes the identical
+# string object: sqlite3's per-connection statement cache is keyed on the SQL
+# text, so repeated calls on a connection reuse the compiled VDBE program.
+# created_at is stamped by SQLite, so writers bind only id/name/rules. It is
+# ISO-8601 UTC like the isoformat() values of older rows, but with millisecond
+# rather than microsecond precision (SQLite's %f); the two still sort in order.
+_UPSERT_POLICY_SQL = """
+    INSERT INTO policies (id, name, rules, active, created_at)
+    VALUES (?, ?, ?, 1, strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+    ON CONFLICT(id) DO UPDATE SET
+        name       = excluded.name,
+        rules      = excluded.rules,
+        active     = 1,
+        created_at = excluded.created_at
+"""
+# ``active`` isn't selected: the WHERE clause already pins it to 1.
+_SELECT_ACTIVE_POLICIES_SQL = "SELECT id, name, rules, created_at FROM policies WHERE active = 1"
+_SELECT_POLICY_ID_BY_NAME_SQL = "SELECT id FROM policies WHERE name = ?"
+_SOFT_DELETE_POLICY_SQL = "UPDATE policies SET active = 0 WHERE id = ? AND active = 1"
 
 
-def save_policy(policy_id: str, name: str, rules: list[dict]) -> dict[str, Any]:
-    """Upsert a policy into the DB and return its full record."""
-    conn = _get_conn()
-    try:
-        conn.execute(
-            """
-            INSERT INTO policies (id, name, rules, active, created_at)
-            VALUES (?, ?, ?, 1, ?)
-            ON CONFLICT(id) DO UPDATE SET
-                name       = excluded.name,
-                rules      = excluded.rules,
-                active     = 1,
-                created_at = excluded.created_at
-            """,
-            (policy_id, name, json.dumps(rules), datetime.now(timezone.utc).isoformat()),
-        )
-        conn.commit()
-        logger.info(f"Policy '{name}' saved to DB (id={policy_id}, {len(rules)} rules).")
-    finally:
-        conn.close()
+# Parsed policies are cached in-process so repeated reads (compliance scans,
+# dashboard stats) skip the SELECT + JSON decode. The cache is keyed on
+# ``PRAGMA data_version`` polled from a dedicated connection that never writes:
+# its value changes whenever any other connection commits to the database.
+_POLICY_CACHE: dict[str, dict] | None = None
+_POLICY_CACHE_VERSION: int | None = None
+_version_conn: sqlite3.Connection | None = None
+_cache_lock = threading.Lock()
+
+
+def _data_version() -> int:
+    """Return the current ``PRAGMA data_version`` of the policies DB."""
+    global _version_conn
+    if _version_conn is None:
+        _version_conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    return _version_conn.execute("PRAGMA data_version").fetchone()[0]
+
+
+def _upsert_policies(records: list[tuple[str, str, bytes]]) -> int:
+    """
+    Write ``(policy_id, name, rules_blob)`` records (blobs from
+    :func:`_encode_rules`) with one executemany of the shared upsert statement,
+    in a single transaction (one commit/fsync for the batch).
+    """
+    with _get_conn() as conn:
+        conn.executemany(_UPSERT_POLICY_SQL, records)
+    return len(records)
+
+def _encode_rules(rules: list[dict] | bytes | str) -> tuple[bytes, list[dict]]:
+    """
+    Return ``(blob, rule_list)`` for the ``rules`` BLOB. Pre-encoded JSON is
+    decoded once to check it, then stored verbatim rather than re-serialised.
+    Raises ValueError unless the rules are a list of rule objects, so a bad
+    payload never reaches the DB (where it would break every policy read).
+    """
+    blob = None
+    if isinstance(rules, (bytes, str)):
+        blob = rules.encode() if isinstance(rules, str) else rules
+        try:
+            rules = orjson.loads(blob)
+        except orjson.JSONDecodeError as e:
+            raise ValueError(f"Policy rules are not valid JSON: {e}") from e
+    if not isinstance(rules, list) or not all(isinstance(rule, dict) for rule in rules):
+        raise ValueError("Policy rules must be a JSON array of rule objects.")
+    return (blob if blob is not None else orjson.dumps(rules)), rules
+
+def save_policy(policy_id: str, name: str, rules: list[dict] | bytes | str) -> dict[str, Any]:
+    """
+    Upsert a policy into the DB and return its full record. ``rules`` may be the
+    rule list or its JSON encoding (e.g. a stored/exported policy), which is
+    written verbatim instead of being re-serialised. Raises ValueError, without
+    writing anything, when the rules are not a list of rule objects.
+    """
+    blob, rules = _encode_rules(rules)
+    _upsert_policies([(policy_id, name, blob)])
+    logger.info(f"Policy '{name}' saved to DB (id={policy_id}, {len(rules)} rules).")
 
     return {"name": name, "rules": rules, "active": True}
 
+def save_policies(policies: list[tuple[str, str, list[dict] | bytes | str]]) -> None:
+    """
+    Upsert several ``(policy_id, name, rules)`` records in a single transaction
+    (one commit/fsync instead of one per policy). Pre-encoded rule JSON is
+    stored verbatim. Every record is validated before the transaction starts,
+    so one bad record raises ValueError and nothing is written.
+    """
+    count = _upsert_policies([
+        (policy_id, name, _encode_rules(rules)[0])
+        for policy_id, name, rules in policies
+    ])
+    logger.info(f"Saved {count} policies to DB in one transaction.")
+
 def get_policy_by_name(name: str):
     """Retrieve an existing policy ID by its name to prevent duplicates."""
-    conn = _get_conn()
-    try:
-        row = conn.execute("SELECT id FROM policies WHERE name = ?", (name,)).fetchone()
-        if row:
-            return row["id"]
-    finally:
-        conn.close()
+    row = _get_readonly_conn().execute(_SELECT_POLICY_ID_BY_NAME_SQL, (name,)).fetchone()
+    if row:
+        return row["id"]
     return None
 
-def get_all_policies() -> dict[str, Any]:
-    """Load all active policies from the DB."""
-    conn = _get_conn()
+def iter_policies() -> Iterator[tuple[str, dict[str, Any]]]:
+    """Yield ``(policy_id, policy)`` for each active policy, decoding rows lazily as they are read."""
+    cursor = _get_readonly_conn().cursor()
+    # Plain tuples for this scan: unpacking by position skips sqlite3.Row's
+    # per-key column-name lookup.
+    cursor.row_factory = None
+    cursor.execute(_SELECT_ACTIVE_POLICIES_SQL)
     try:
-        rows = conn.execute(
-            "SELECT id, name, rules, active, created_at FROM policies WHERE active = 1"
-        ).fetchall()
+        for policy_id, name, rules_json, created_at in cursor:
+            yield policy_id, {
+                "name": name,
+                # orjson accepts both the BLOB rows we write and legacy TEXT rows
+                "rules": orjson.loads(rules_json),
+                "active": True,
+                "created_at": created_at,
+            }
     finally:
-        conn.close()
+        cursor.close()
 
-    return {
-        row["id"]: {
-            "name": row["name"],
-            "rules": json.loads(row["rules"]),
-            "active": bool(row["active"]),
-            "created_at": row["created_at"],
-        }
-        for row in rows
-    }
+def get_all_policies() -> dict[str, Any]:
+    """
+    Load all active policies, served from the in-process cache when the DB is unchanged.
+    The returned dict is a fresh copy, but the policy and rule dicts inside it are
+    shared with the cache and every other caller: treat them as read-only (copy a
+    policy before changing it; write changes through :func:`save_policy`).
+    """
+    global _POLICY_CACHE, _POLICY_CACHE_VERSION
+    with _cache_lock:
+        version = _data_version()
+        if _POLICY_CACHE is not None and _POLICY_CACHE_VERSION == version:
+            return dict(_POLICY_CACHE)
+
+        _POLICY_CACHE = dict(iter_policies())
+        _POLICY_CACHE_VERSION = version
+        return dict(_POLICY_CACHE)
+
+async def get_all_policies_async() -> dict[str, Any]:
+    """
+    Event-loop friendly :func:`get_all_policies`: the DB read and JSON decode run
+    in a worker thread. The same read-only contract applies to the result.
+    """
+    return await asyncio.to_thread(get_all_policies)
 
 def delete_policy(policy_id: str) -> bool:
     """Soft-delete a policy by marking it inactive."""
-    conn = _get_conn()
-    try:
-        cursor = conn.execute(
-            "UPDATE policies SET active = 0 WHERE id = ? AND active = 1",
-            (policy_id,),
-        )
-        conn.commit()
-        deleted = cursor.rowcount > 0
-    finally:
-        conn.close()
+    with _get_conn() as conn:
+        cursor = conn.execute(_SOFT_DELETE_POLICY_SQL, (policy_id,))
+    deleted = cursor.rowcount > 0
 
     if deleted:
         logger.info(f"Policy '{policy_id}' soft-deleted.")
@@ -370,12 +1188,8 @@ def seed_demo_policies() -> None:
 
 def clear_all_policies() -> None:
     """Delete all policies and associated audit logs to reset the system."""
-    conn = _get_conn()
-    try:
+    with _get_conn() as conn:
         conn.execute("DELETE FROM policies")
         conn.execute("DELETE FROM audit_logs")
-        conn.commit()
-        logger.info("All policies and audit logs have been cleared.")
-    finally:
-        conn.close()
+    logger.info("All policies and audit logs have been cleared.")
 
@@ -1,5 +1,6 @@
 import os
-from typing import Dict, Any, List
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -7,6 +8,78 @@ load_dotenv()
 # Configuration
 TAMPER_THRESHOLD = int(os.getenv("VERIDOC_TAMPER_THRESHOLD", "70"))
 
+# Blending weights (Universal Dynamic), read once at import like the threshold
+WEIGHT_CRYPTO = float(os.getenv("SCORING_WEIGHT_CRYPTO", 0.35))
+WEIGHT_STRUCTURAL = float(os.getenv("SCORING_WEIGHT_STRUCTURAL", 0.35))
+WEIGHT_VISUAL = float(os.getenv("SCORING_WEIGHT_VISUAL", 0.30))
+WEIGHT_TECH = float(os.getenv("SCORING_WEIGHT_TECH", 0.8))
+WEIGHT_AI = float(os.getenv("SCORING_WEIGHT_AI", 0.2))
+
+# Shared read-only default for missing report sections
+_EMPTY: Mapping[str, Any] = MappingProxyType({})
+
+def _gate_multipliers(validation_map: Dict[str, Any]) -> Dict[str, float]:
+    """
+    Soft gates for every AI validation entry, parsed once per scoring call.
+    Each maps to a Multiplier (0.0 to 1.0):
+    1.0 = Fully Valid (AI says 0% Invalid).
+    0.0 = Fully Invalid (AI says 100% Invalid).
+    The map comes from the LLM, so anything but a dict (None, a list) yields no gates.
+    """
+    if not isinstance(validation_map, dict):
+        return {}
+    gates = {}
+    for key, entry in validation_map.items():
+        if not isinstance(entry, dict):
+            continue
+        # Fallback for old prompt format if key missing
+        raw_conf = entry.get("invalidation_confidence", 0)
+
+        # ROBUST PARSING: Handle "80%", "80", 80, None
+        try:
+            if raw_conf is None:
+                inv_conf = 0.0
+            elif isinstance(raw_conf, (int, float)):
+                inv_conf = float(raw_conf)
+            else:
+                # Clean string
+                clean_s = str(raw_conf).replace('%', '').strip()
+                inv_conf = float(clean_s) if clean_s else 0.0
+        except Exception:
+            inv_conf = 0.0 # Default to valid if parsing fails
+
+        # Backward compatibility: if "Invalid" but no confidence, assume 100%
+        if str(entry.get("verdict") or "").upper() == "INVALID" and "invalidation_confidence" not in entry:
+            inv_conf = 100.0
+
+        gates[key] = max(0.0, 1.0 - (inv_conf / 100.0))
+    return gates
+
+def _gate_for(gates: Dict[str, float], component_key_base: str, specific_idx: int) -> float:
+    """Gate for one component: specific key first (e.g. segformer_img_0), then generic (segformer)."""
+    gate = gates.get(f"{component_key_base}_img_{specific_idx}")
+    if gate is None:
+        gate = gates.get(component_key_base, 1.0) # Default to fully valid if AI didn't mention it
+    return gate
+
+def _weighted_average(components: List[tuple]) -> float:
+    """
+    Calculates dynamic weighted average.
+    components: List of tuples (Score, Weight, IsValid)
+    """
+    numerator = 0.0
+    denominator = 0.0
+    
+    for score, weight, is_valid in components:
+        if is_valid:
+            numerator += score * weight
+            denominator += weight
+    
+    if denominator == 0:
+        return 100.0 # Default clean if everything invalid
+    
+    return numerator / denominator
+
 def calculate_final_score(
     pipeline_type: str,
     local_report: Dict[str, Any],
@@ -18,29 +91,11 @@ def calculate_final_score(
     
     Formula: S_total = Sum(Si * Wi * Bi) / Sum(Wi * Bi)
     """
-    
-    # --- HELPER FUNCTION ---
-    def weighted_average(components: List[tuple]) -> float:
-        """
-        Calculates dynamic weighted average.
-        components: List of tuples (Score, Weight, IsValid)
-        """
-        numerator = 0.0
-        denominator = 0.0
-        
-        for score, weight, is_valid in components:
-            if is_valid:
-                numerator += score * weight
-                denominator += weight
-        
-        if denominator == 0:
-            return 100.0 # Default clean if everything invalid
-        
-        return numerator / denominator
 
     # 1. Extract Inputs
     ai_dry_score = ai_result.get("authenticity_score", 50)
     validation_map = ai_result.get("validation_map", {})
+    gates = _gate_multipliers(validation_map)
     details = local_report.get("details", {})
     
     # Defensive initialization of flags
@@ -64,67 +119,28 @@ def calculate_final_score(
         
         for img in analyzed_images:
             idx = img.get("index", 0)
-            v_rep = img.get("visual_report", {}).get("details", {}) or img.get("visual_report", {}) # specific or top
-            
-            # --- SOFT GATING HELPER ---
-            def get_gate(component_key_base, specific_idx=None):
-                """
-                Returns a Multiplier (0.0 to 1.0).
-                1.0 = Fully Valid (AI says 0% Invalid).
-                0.0 = Fully Invalid (AI says 100% Invalid).
-                """
-                # Try specific key first (e.g., segformer_img_0), then generic (segformer)
-                keys_to_try = []
-                if specific_idx is not None:
-                    keys_to_try.append(f"{component_key_base}_img_{specific_idx}")
-                keys_to_try.append(component_key_base)
-                
-                for k in keys_to_try:
-                    if k in validation_map:
-                        entry = validation_map[k]
-                        # Fallback for old prompt format if key missing
-                        raw_conf = entry.get("invalidation_confidence", 0)
-                        
-                        # ROBUST PARSING: Handle "80%", "80", 80, None
-                        try:
-                            if raw_conf is None:
-                                inv_conf = 0.0
-                            elif isinstance(raw_conf, (int, float)):
-                                inv_conf = float(raw_conf)
-                            else:
-                                # Clean string
-                                clean_s = str(raw_conf).replace('%', '').strip()
-                                inv_conf = float(clean_s) if clean_s else 0.0
-                        except Exception:
-                            inv_conf = 0.0 # Default to valid if parsing fails
-
-                        # Backward compatibility: if "Invalid" but no confidence, assume 100%
-                        if entry.get("verdict", "").upper() == "INVALID" and "invalidation_confidence" not in entry:
-                             inv_conf = 100.0
-                             
-                        return max(0.0, 1.0 - (inv_conf / 100.0))
-                
-                return 1.0 # Default to fully valid if AI didn't mention it
+            visual_report = img.get("visual_report") or _EMPTY
+            v_rep = visual_report.get("details") or visual_report # specific or top
             
             # 1. SegFormer
-            sf_conf = v_rep.get("semantic_segmentation", {}).get("confidence_score", 0.0)
+            sf_conf = (v_rep.get("semantic_segmentation") or _EMPTY).get("confidence_score", 0.0)
             sf_score = max(0, 100 - (sf_conf * 100))
-            sf_gate = get_gate("segformer", idx)
+            sf_gate = _gate_for(gates, "segformer", idx)
             
             # 2. TruFor
-            tf_data = v_rep.get("trufor", {})
+            tf_data = v_rep.get("trufor") or _EMPTY
             tf_score = tf_data.get("trust_score", 1.0) * 100
-            tf_gate = get_gate("trufor", idx)
+            tf_gate = _gate_for(gates, "trufor", idx)
             
             # 3. ELA
-            ela_val = v_rep.get("ela", {}).get("max_difference", 0.0)
+            ela_val = (v_rep.get("ela") or _EMPTY).get("max_difference", 0.0)
             ela_score = max(0, 100 - float(ela_val))
-            ela_gate = get_gate("ela", idx)
+            ela_gate = _gate_for(gates, "ela", idx)
             
             # 4. Noise
-            var_val = float(v_rep.get("noise_analysis", {}).get("average_diff", 0.0))
+            var_val = float((v_rep.get("noise_analysis") or _EMPTY).get("average_diff", 0.0))
             var_score = max(0, 100 - (var_val * 10))
-            noise_gate = get_gate("noise", idx) # AI usually doesn't judge noise, but we allow it
+            noise_gate = _gate_for(gates, "noise", idx) # AI usually doesn't judge noise, but we allow it
             
             # Calculate Dynamic Visual Score
             # Weights: SegFormer 0.35, TruFor 0.30, ELA 0.15, Noise 0.10, DCT 0.10
@@ -137,7 +153,7 @@ def calculate_final_score(
                 (var_score, 0.20 * noise_gate, True)
             ]
             
-            img_scores.append(weighted_average(v_components))
+            img_scores.append(_weighted_average(v_components))
             
         visual_score = min(img_scores) if img_scores else 100.0
         score_components["Visual Forensics"] = round(visual_score, 1) if has_visual else "N/A"
@@ -219,21 +235,30 @@ def calculate_final_score(
 
     # --- FINAL DYNAMIC PIPELINE BLENDING ---
     
-    # Revised Weights for Universal Dynamic (Loaded from Env):
-    w_crypto = float(os.getenv("SCORING_WEIGHT_CRYPTO", 0.35))
-    w_struct = float(os.getenv("SCORING_WEIGHT_STRUCTURAL", 0.35))
-    w_visual = float(os.getenv("SCORING_WEIGHT_VISUAL", 0.30))
+    # Revised Weights for Universal Dynamic (Loaded from Env at import):
+    w_crypto = WEIGHT_CRYPTO
+    w_struct = WEIGHT_STRUCTURAL
+    w_visual = WEIGHT_VISUAL
 
-    final_components = [
-        (crypto_score, w_crypto * sig_gate, has_crypto),
-        (struct_score, w_struct * meta_gate, has_struct),
-        (visual_score, w_visual, has_visual) # Visual gates already applied to sub-components
-    ]
-    
-    weighted_tech = weighted_average(final_components)
+    if has_crypto + has_struct + has_visual == 1:
+        # Single valid component (e.g. crypto-only PDFs): the average is just its score
+        single_score, single_weight = (
+            (crypto_score, w_crypto * sig_gate) if has_crypto
+            else (struct_score, w_struct * meta_gate) if has_struct
+            else (visual_score, w_visual)
+        )
+        weighted_tech = float(single_score) if single_weight else 100.0
+    else:
+        final_components = [
+            (crypto_score, w_crypto * sig_gate, has_crypto),
+            (struct_score, w_struct * meta_gate, has_struct),
+            (visual_score, w_visual, has_visual) # Visual gates already applied to sub-components
+        ]
+        
+        weighted_tech = _weighted_average(final_components)
     
-    tech_weight = float(os.getenv("SCORING_WEIGHT_TECH", 0.8))
-    ai_weight = float(os.getenv("SCORING_WEIGHT_AI", 0.2))
+    tech_weight = WEIGHT_TECH
+    ai_weight = WEIGHT_AI
     
     # STRICT FORMULA: No Safety Valves, No Dissent Resolution.
     # The score is exactly what the weights say it is.
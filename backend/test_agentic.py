@@ -18,5 +18,5 @@ print("Starting Agentic Extraction Test...")
 results = extract_rules_from_text(policy_doc, "Global Compliance Policy")
 
 print("\n--- Final Output ---")
-import json
-print(json.dumps(results, indent=2))
+import orjson
+print(orjson.dumps(results, option=orjson.OPT_INDENT_2).decode())
@@ -0,0 +1,37 @@
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.scoring_engine import calculate_final_score
+
+# Regression: a malformed validation_map from the LLM (null / list) must not
+# crash scoring; it is treated as "no AI gates".
+crypto_report = {
+    "score": 0.0,
+    "details": {
+        "signatures": [{"intact": True, "valid": True, "trusted": True}],
+    },
+}
+visual_report = {
+    "details": {
+        "analyzed_images": [{
+            "index": 0,
+            "visual_report": {
+                "semantic_segmentation": {"confidence_score": 0.1},
+                "trufor": {"trust_score": 0.9},
+                "ela": {"max_difference": 5.0},
+                "noise_analysis": {"average_diff": 1.0},
+            },
+        }],
+    },
+}
+
+for bad_map in (None, []):
+    for pipeline_type, report in (("cryptographic", crypto_report), ("visual", visual_report)):
+        result = calculate_final_score(pipeline_type, report, {"authenticity_score": 60, "validation_map": bad_map})
+        expected = calculate_final_score(pipeline_type, report, {"authenticity_score": 60, "validation_map": {}})
+        assert result == expected, (pipeline_type, bad_map, result, expected)
+        print(f"{pipeline_type} with validation_map={bad_map!r}: {result['authenticity_score']}")
+
+assert calculate_final_score("cryptographic", crypto_report, {"validation_map": None})["authenticity_score"] == 90
+print("OK")
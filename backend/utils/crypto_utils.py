@@ -1,41 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import hashlib
 import os
-import certifi
+import re
 import logging
-from typing import List, Optional, Dict, Any
-
-from pyhanko_certvalidator import ValidationContext
-from pyhanko_certvalidator.registry import SimpleCertificateStore
-from pyhanko.sign.validation import async_validate_pdf_signature
-from pyhanko.sign.validation.status import SignatureStatus
-from cryptography.hazmat.primitives import hashes
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, List, Optional, Dict, Any
 
-from asn1crypto import x509, pem
+# pyhanko / asn1crypto / certifi are imported where they are used, so importing
+# this module stays cheap until a signature is actually validated
+if TYPE_CHECKING:
+    from asn1crypto import x509
+    from pyhanko_certvalidator import ValidationContext
+    from pyhanko_certvalidator.fetchers import Fetchers
+    from pyhanko_certvalidator.registry import SimpleCertificateStore
 
 
 # Setup Logger
 logger = logging.getLogger(__name__)
 
+# path relative to this file: ../../resources/trust_store
+LOCAL_TRUST_STORE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "resources", "trust_store"
+)
+
+def _trust_store_stamp(certifi_path: str, local_store_path: str) -> tuple:
+    """Modification stamp of the trust sources; changes when a root is added, removed or edited."""
+    stamps = []
+    for path in (certifi_path, local_store_path):
+        try:
+            stamps.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            stamps.append(None)
+    if os.path.isdir(local_store_path):
+        for root, _, files in os.walk(local_store_path):
+            for file in files:
+                try:
+                    stamps.append(os.stat(os.path.join(root, file)).st_mtime_ns)
+                except OSError:
+                    continue
+    return tuple(stamps)
+
+def _load_certificates(data: bytes) -> List[x509.Certificate]:
+    """
+    Parse every certificate in ``data``: a single DER certificate, or PEM with
+    one or more blocks (a bundle like certifi's is unarmored in one pass).
+    """
+    from asn1crypto import x509, pem
+
+    if pem.detect(data):
+        return [
+            x509.Certificate.load(der)
+            for type_name, _, der in pem.unarmor(data, multiple=True)
+            if type_name == "CERTIFICATE"
+        ]
+    return [x509.Certificate.load(data)]
+
 def load_trust_store() -> SimpleCertificateStore:
     """
     Loads a Hybrid Trust Store:
     1. Standard Web Trust from 'certifi' (Mozilla CA Bundle).
     2. Local Custom Roots from 'backend/resources/trust_store'.
+
+    The parsed store is cached and only rebuilt when one of the sources
+    changes on disk, so each signed PDF doesn't re-parse every root.
+    Callers must treat the returned store as read-only.
     """
+    import certifi
+
+    certifi_path = certifi.where()
+    return _build_trust_store(
+        certifi_path,
+        LOCAL_TRUST_STORE_PATH,
+        _trust_store_stamp(certifi_path, LOCAL_TRUST_STORE_PATH),
+    )
+
+@functools.lru_cache(maxsize=1)
+def _build_trust_store(certifi_path: str, local_store_path: str, stamp: tuple) -> SimpleCertificateStore:
+    from pyhanko_certvalidator.registry import SimpleCertificateStore
+
     store = SimpleCertificateStore()
     
     # 1. Load Standard Web Trust (Certifi)
     try:
-        certifi_path = certifi.where()
-        store.register_multiple(certifi_path)
-        logger.info(f"Loaded Standard Trust Store from {certifi_path}")
+        with open(certifi_path, "rb") as f:
+            web_roots = _load_certificates(f.read())
+        store.register_multiple(web_roots)
+        logger.info(f"Loaded {len(web_roots)} certificates from Standard Trust Store {certifi_path}")
     except Exception as e:
         logger.warning(f"Failed to load certifi trust store: {e}")
 
     # 2. Load Local Custom Roots
-    # path relative to this file: ../../resources/trust_store
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    local_store_path = os.path.join(base_dir, "resources", "trust_store")
-    
     if os.path.exists(local_store_path):
         count = 0
         for root, _, files in os.walk(local_store_path):
@@ -45,15 +102,11 @@ def load_trust_store() -> SimpleCertificateStore:
                     with open(file_path, "rb") as f:
                         data = f.read()
 
-                        # Use asn1crypto to load (handles both PEM and DER)
+                        # Use asn1crypto to load (handles DER, PEM and PEM bundles)
                         try:
-                            # Explicitly handle PEM if detected
-                            if pem.detect(data):
-                                _, _, data = pem.unarmor(data)
-                            
-                            cert = x509.Certificate.load(data)
-                            store.register(cert)
-                            count += 1
+                            certs = _load_certificates(data)
+                            store.register_multiple(certs)
+                            count += len(certs)
                         except Exception as load_err:
                             # Not a valid cert
                             logger.debug(f"File {file} is not a valid certificate: {load_err}")
@@ -67,6 +120,92 @@ def load_trust_store() -> SimpleCertificateStore:
             
     return store
 
+# Digest algorithms flagged as weak (legacy) in forensic reports
+_WEAK_HASHES = frozenset({'sha1', 'md5'})
+
+# Upper bound on how long fetched revocation info / AIA certs are reused; also
+# covers OCSP responses without nextUpdate.
+_REVINFO_MAX_AGE = timedelta(hours=1)
+# pyhanko also caches failed fetches; after an OCSP/CRL outage the shared
+# fetchers are only kept this long, so revocation checks recover quickly.
+_FETCH_FAILURE_MAX_AGE = timedelta(seconds=60)
+
+# (fetchers, created_at) shared by every ValidationContext; see _get_shared_fetchers
+_shared_fetchers: Optional[tuple] = None
+
+class _FailureTrackingFetcher:
+    """
+    Delegates to a pyhanko OCSP / CRL fetcher, recording when a fetch first
+    fails (the fetcher caches that failure and re-raises it on every retry).
+    """
+
+    def __init__(self, fetcher):
+        self._fetcher = fetcher
+        self.failed_at: Optional[datetime] = None
+
+    async def fetch(self, *args, **kwargs):
+        try:
+            return await self._fetcher.fetch(*args, **kwargs)
+        except Exception:
+            if self.failed_at is None:
+                self.failed_at = datetime.now(timezone.utc)
+            raise
+
+    def __getattr__(self, name):
+        return getattr(self._fetcher, name)
+
+def _revinfo_expiry(fetchers: Fetchers, created_at: datetime) -> datetime:
+    """
+    Earliest nextUpdate among the fetched OCSP responses and CRLs, capped at
+    _REVINFO_MAX_AGE, or _FETCH_FAILURE_MAX_AGE after the first failed fetch.
+    """
+    expiry = created_at + _REVINFO_MAX_AGE
+    for fetcher in (fetchers.ocsp_fetcher, fetchers.crl_fetcher):
+        if fetcher.failed_at is not None:
+            expiry = min(expiry, fetcher.failed_at + _FETCH_FAILURE_MAX_AGE)
+    for response in fetchers.ocsp_fetcher.fetched_responses():
+        try:
+            basic = response['response_bytes']['response'].parsed
+            for single in basic['tbs_response_data']['responses']:
+                next_update = single['next_update'].native
+                if next_update is not None:
+                    expiry = min(expiry, next_update)
+        except Exception:
+            continue  # unsuccessful / malformed responses carry no validity window
+    for crl in fetchers.crl_fetcher.fetched_crls():
+        try:
+            next_update = crl['tbs_cert_list']['next_update'].native
+            if next_update is not None:
+                expiry = min(expiry, next_update)
+        except Exception:
+            continue
+    return expiry
+
+def _get_shared_fetchers() -> Fetchers:
+    """
+    OCSP / CRL / AIA fetchers shared across validation contexts, so a chain
+    seen on one PDF doesn't trigger the same HTTP round-trips for the next.
+    pyhanko's fetchers cache their results without expiry, so the whole set is
+    replaced once any cached response passes its nextUpdate, or shortly after
+    an OCSP / CRL fetch fails.
+    """
+    from pyhanko_certvalidator.fetchers import Fetchers, default_fetcher_backend
+
+    global _shared_fetchers
+    now = datetime.now(timezone.utc)
+    if _shared_fetchers is not None:
+        fetchers, created_at = _shared_fetchers
+        if now < _revinfo_expiry(fetchers, created_at):
+            return fetchers
+    backend_fetchers = default_fetcher_backend().get_fetchers()
+    fetchers = Fetchers(
+        ocsp_fetcher=_FailureTrackingFetcher(backend_fetchers.ocsp_fetcher),
+        crl_fetcher=_FailureTrackingFetcher(backend_fetchers.crl_fetcher),
+        cert_fetcher=backend_fetchers.cert_fetcher,
+    )
+    _shared_fetchers = (fetchers, now)
+    return fetchers
+
 def get_validation_context() -> ValidationContext:
     """
     Returns a 'Smart' ValidationContext with standard forensic defaults:
@@ -75,24 +214,41 @@ def get_validation_context() -> ValidationContext:
     - Soft-Fail Revocation (Best effort check)
     - Time Tolerance (for clock skew)
     """
-    from datetime import timedelta
-    
+    from pyhanko_certvalidator import ValidationContext
+
+    # The parsed roots are shared, but the context itself is built per call:
+    # it carries per-validation state (fetched OCSP/CRL responses, certs
+    # collected from the PDF being validated) that shouldn't leak across documents.
+    # Only the network fetchers (and their response cache) are shared.
     trust_store = load_trust_store()
     
     return ValidationContext(
         trust_roots=trust_store,
         allow_fetching=True,             # ENABLE AIA & OCSP (Zero-Touch)
+        fetchers=_get_shared_fetchers(), # Reuse fresh OCSP/CRL/AIA responses
         revocation_mode="soft-fail",     # Don't crash if offline
-        weak_hash_algos={'sha1', 'md5'}, # Explicitly allow but we will flag them later
+        weak_hash_algos=_WEAK_HASHES,    # Explicitly allow but we will flag them later
         time_tolerance=timedelta(seconds=10),  # 10s clock skew tolerance
         other_certs=[]                   # Can be populated if needed
     )
 
+# Key types whose size the weak-key check compares (those cryptography exposes
+# a key_size for); Ed25519/Ed448 keys have a fixed size and are skipped.
+_SIZED_KEY_ALGORITHMS = frozenset({"rsa", "rsassa_pss", "dsa", "ec"})
+
+# Error classification for failed validations, checked in this order: a
+# legacy-algorithm error wins over a trust/policy one even if both words appear.
+_LEGACY_ALGO_ERR_RE = re.compile(r"weak|algorithm", re.IGNORECASE)
+_TRUST_ERR_RE = re.compile(r"policy|trust|certificate", re.IGNORECASE)
+
 async def validate_signature_forensic(sig_obj, validation_context: ValidationContext) -> Dict[str, Any]:
     """
     Validates a signature object and returns a comprehensive forensic report.
     Handles 'Weak Algorithm' and 'Policy' errors gracefully.
     """
+    from pyhanko.sign.validation import async_validate_pdf_signature
+    from pyhanko.sign.validation.status import SignatureStatus
+
     result = {
         "field": sig_obj.field_name,
         "valid": False,
@@ -139,25 +295,24 @@ async def validate_signature_forensic(sig_obj, validation_context: ValidationCon
             result['issuer'] = cert.issuer.human_friendly
             result['serial_number'] = str(cert.serial_number)
             
-            # Convert to cryptography object for advanced inspection (fingerprint, key size)
             try:
-                from cryptography.x509 import load_der_x509_certificate
-                crypto_cert = load_der_x509_certificate(cert.dump())
-                
-                result['fingerprint'] = crypto_cert.fingerprint(hashes.SHA256()).hex()
-
-                # Check for Weak Key (RSA < 2048)
-                public_key = crypto_cert.public_key()
-                if hasattr(public_key, 'key_size'):
-                    if public_key.key_size < 2048:
+                # SHA-256 over the DER encoding, same value as cryptography's fingerprint()
+                result['fingerprint'] = hashlib.sha256(cert.dump()).hexdigest()
+
+                # Check for Weak Key (RSA < 2048), read off the already-parsed
+                # SubjectPublicKeyInfo instead of re-parsing the DER
+                public_key = cert.public_key
+                if public_key.algorithm in _SIZED_KEY_ALGORITHMS:
+                    key_size = public_key.bit_size
+                    if key_size < 2048:
                         result['weak_key'] = True
-                        result['warnings'].append(f"Weak Key Size: {public_key.key_size} bits")
+                        result['warnings'].append(f"Weak Key Size: {key_size} bits")
             except Exception as e:
                 logger.warning(f"Failed to inspect certificate details: {e}")
 
 
         # Check for Weak Hash
-        if status.md_algorithm in ['sha1', 'md5']:
+        if status.md_algorithm in _WEAK_HASHES:
             result['weak_hash'] = True
             result['warnings'].append(f"Weak Hash Algorithm: {status.md_algorithm}")
 
@@ -176,12 +331,12 @@ async def validate_signature_forensic(sig_obj, validation_context: ValidationCon
         # Only if pyhanko successfully validates and returns intact=False should we treat it as tampering.
         
         # Heuristic Analysis of Error
-        if "weak" in err_str.lower() or "algorithm" in err_str.lower():
+        if _LEGACY_ALGO_ERR_RE.search(err_str):
             result['weak_hash'] = True
             result['valid'] = True # Physically intact, just old
             result['intact'] = True
             result['warnings'].append(f"Legacy Algorithm detected: {err_str}")
-        elif "policy" in err_str.lower() or "trust" in err_str.lower() or "certificate" in err_str.lower():
+        elif _TRUST_ERR_RE.search(err_str):
              # Trust/Policy failures mean we can't verify WHO signed it, not that it's tampered
              result['valid'] = False
              result['intact'] = True  # Assume intact unless proven otherwise
@@ -195,3 +350,19 @@ async def validate_signature_forensic(sig_obj, validation_context: ValidationCon
              result['warnings'].append(f"Validation error: {err_str[:100]}")
              
     return result
+
+async def validate_signatures_forensic(
+    sig_objs, validation_context: ValidationContext, concurrency: int = 8
+) -> List[Dict[str, Any]]:
+    """
+    Validates all signatures of a PDF concurrently (at most ``concurrency`` at a
+    time), so their OCSP / CRL / AIA fetches overlap instead of running back to
+    back. Returns the forensic reports in input order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _validate_one(sig_obj) -> Dict[str, Any]:
+        async with semaphore:
+            return await validate_signature_forensic(sig_obj, validation_context)
+
+    return await asyncio.gather(*(_validate_one(sig_obj) for sig_obj in sig_objs))
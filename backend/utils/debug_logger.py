@@ -1,10 +1,14 @@
 
+import copy
 import logging
 import collections
+import time
+import orjson
 from fastapi import APIRouter, Request
-from datetime import datetime
 
 # Configure Buffer
+# Holds LogRecords (formatted lazily when /debug/logs is read) and
+# preformatted frontend entries.
 LOG_BUFFER_SIZE = 500
 log_buffer = collections.deque(maxlen=LOG_BUFFER_SIZE)
 
@@ -12,11 +16,30 @@ log_buffer = collections.deque(maxlen=LOG_BUFFER_SIZE)
 class MemoryHandler(logging.Handler):
     def emit(self, record):
         try:
-            msg = self.format(record)
-            log_buffer.append(msg)
+            log_buffer.append(self.prepare(record))
         except Exception:
             self.handleError(record)
 
+    def prepare(self, record):
+        """
+        Snapshot a record for the buffer, as QueueHandler.prepare does: the
+        message is merged with its args and the traceback rendered to text now,
+        so neither reflects later mutation nor keeps args/frames alive. Only the
+        Formatter call is deferred.
+        """
+        record = copy.copy(record)  # other handlers still see the original
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = (self.formatter or logging.Formatter()).formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def render(self, entry) -> str:
+        """Buffer entry as display text; records are only formatted when read."""
+        return entry if isinstance(entry, str) else self.format(entry)
+
 # Setup Logger
 logger = logging.getLogger("veridoc_debug")
 logger.setLevel(logging.INFO)
@@ -32,6 +55,23 @@ logger.addHandler(memory_handler)
 logging.getLogger().addHandler(memory_handler)
 
 
+# (epoch second, formatted timestamp) of the last frontend log entry, so
+# strftime runs at most once per second however chatty the frontend is
+_last_timestamp = (None, "")
+
+def _timestamp() -> str:
+    global _last_timestamp
+    now = int(time.time())
+    second, formatted = _last_timestamp
+    if second != now:
+        formatted = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(now))
+        _last_timestamp = (now, formatted)
+    return formatted
+
+
+# Frontend log bodies above this are rejected before being read/parsed
+_MAX_FRONTEND_LOG_BYTES = 64 * 1024
+
 # API Router
 debug_router = APIRouter()
 
@@ -45,7 +85,7 @@ async def get_debug_logs(limit: int = 100):
     return {
         "count": len(all_logs),
         "limit": limit,
-        "logs": all_logs[-limit:]
+        "logs": [memory_handler.render(entry) for entry in all_logs[-limit:]]
     }
 
 @debug_router.post("/debug/logs")
@@ -55,10 +95,17 @@ async def store_frontend_log(request: Request):
     Expects JSON: { "level": "INFO", "message": "..." }
     """
     try:
-        data = await request.json()
+        content_length = request.headers.get("content-length")
+        if content_length is not None and int(content_length) > _MAX_FRONTEND_LOG_BYTES:
+            return {"status": "error", "message": "Log entry too large"}
+
+        body = await request.body()
+        if len(body) > _MAX_FRONTEND_LOG_BYTES:  # no/incorrect Content-Length
+            return {"status": "error", "message": "Log entry too large"}
+        data = orjson.loads(body)
         level = data.get("level", "INFO").upper()
         message = data.get("message", "No message provided")
-        timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        timestamp = _timestamp()
         
         entry = f"{timestamp} - [FRONTEND:{level}] - {message}"
         log_buffer.append(entry)
@@ -1,17 +1,31 @@
 import random
-import numpy as np
-import torch
+import functools
 import hashlib
 import os
 import logging
 
+# torch / numpy are imported on first use, so importing this module is cheap
+
 logger = logging.getLogger("determinism")
 
+@functools.lru_cache(maxsize=None)
+def _has_cuda() -> bool:
+    """
+    Resolved once: checking availability (and seeding CUDA) would otherwise
+    initialise the CUDA runtime on every call, even on CPU-only deployments.
+    """
+    import torch
+
+    return torch.cuda.is_available()
+
 def set_global_seed(seed: int = 42):
     """
     Sets the random seed for Python, NumPy, PyTorch, and CUDA to ensure reproducible results.
     Call this before every major stochastic operation (e.g., model inference).
     """
+    import numpy as np
+    import torch
+
     # 1. Python random
     random.seed(seed)
     
@@ -20,10 +34,11 @@ def set_global_seed(seed: int = 42):
     
     # 3. PyTorch
     torch.manual_seed(seed)
-    torch.cuda.manual_seed(seed)
-    torch.cuda.manual_seed_all(seed)  # if you are using multi-GPU.
+    if _has_cuda():
+        torch.cuda.manual_seed_all(seed)  # covers every device, incl. the current one
     
     # 4. CuDNN Determinism
+    # Re-applied on every call: these are global toggles other code may flip.
     # Benchmarking causes the cudnn backend to search for the fastest convolution algorithm
     # which can result in non-deterministic behavior.
     torch.backends.cudnn.benchmark = False
@@ -37,24 +52,43 @@ def set_global_seed(seed: int = 42):
     
     # logger.info(f"Global seed set to {seed}. Determinism enforced.")
 
+# Elements of a torch tensor hashed by get_tensor_fingerprint (16 KiB of fp32)
+_HASH_SAMPLE_ELEMS = 4096
+
+def _short_hash(arr) -> str:
+    """
+    First 8 hex chars of SHA-256 over the array's C-order bytes (same as
+    hashing arr.tobytes()), fed to hashlib through a memoryview so contiguous
+    arrays aren't copied first.
+    """
+    import numpy as np
+
+    arr = np.ascontiguousarray(arr)  # no-op unless the array is strided
+    return hashlib.sha256(memoryview(arr).cast('B')).hexdigest()[:8]
+
 def get_tensor_fingerprint(tensor, name: str = "tensor") -> str:
     """
     Returns a short hash + stats of a tensor to track data consistency.
     Useful for debugging where data changes between runs.
     """
+    import numpy as np
+    import torch
+
     try:
         if isinstance(tensor, torch.Tensor):
-             # Move to CPU for analysis
-             t_cpu = tensor.detach().cpu().float()
-             min_v = t_cpu.min().item()
-             max_v = t_cpu.max().item()
-             mean_v = t_cpu.mean().item()
-             # Create simple hash from the raw bytes of first 1000 elements (speed)
-             # or purely stats if data is massive
-             
-             # Robust Hash: Convert to numpy, ensure consistent endianness
-             data_bytes = t_cpu.numpy().tobytes()
-             sha = hashlib.sha256(data_bytes).hexdigest()[:8]
+             # Stats are reduced on the tensor's own device in its own dtype;
+             # only the three scalars cross to the host, in one transfer
+             t = tensor.detach()
+             min_v, max_v, mean_v = torch.stack([
+                 t.amin().float(), t.amax().float(), t.mean(dtype=torch.float32)
+             ]).tolist()
+
+             # Hash the first _HASH_SAMPLE_ELEMS elements in their native dtype
+             # rather than copying the whole tensor to the host
+             sample = t.reshape(-1)[:_HASH_SAMPLE_ELEMS].to('cpu').contiguous()
+             if sample.dtype == torch.bfloat16:
+                 sample = sample.view(torch.int16)  # numpy has no bfloat16
+             sha = _short_hash(sample.numpy())
              
              return f"[{name}] Shape: {list(tensor.shape)} | Range: [{min_v:.4f}, {max_v:.4f}] | Mean: {mean_v:.4f} | Hash: {sha}"
              
@@ -62,8 +96,7 @@ def get_tensor_fingerprint(tensor, name: str = "tensor") -> str:
              min_v = tensor.min()
              max_v = tensor.max()
              mean_v = tensor.mean()
-             data_bytes = tensor.tobytes()
-             sha = hashlib.sha256(data_bytes).hexdigest()[:8]
+             sha = _short_hash(tensor)
              
              return f"[{name}] Shape: {tensor.shape} | Range: [{min_v:.4f}, {max_v:.4f}] | Mean: {mean_v:.4f} | Hash: {sha}"
              
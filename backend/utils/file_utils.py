@@ -2,13 +2,32 @@
 file_utils.py
 Filesystem helper utilities for the EntropyShield backend.
 """
+import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 from utils.debug_logger import get_logger
 
 logger = get_logger()
 
+# Stale uploads are independent, so their deletions can overlap
+_CLEANUP_WORKERS = 8
+
+
+def _remove_stale_entry(victim: tuple) -> None:
+    """Delete one (path, name, is_dir) entry found by cleanup_stale_files."""
+    path, name, is_dir = victim
+    try:
+        if is_dir:
+            shutil.rmtree(path)
+            logger.info(f"Background cleanup: removed dir {name}")
+        else:
+            os.unlink(path)
+            logger.info(f"Background cleanup: removed file {name}")
+    except Exception as e:
+        logger.warning(f"Cleanup skipped {name}: {e}")
+
 
 def cleanup_stale_files(directory: Path, max_age_seconds: int = 300) -> None:
     """
@@ -22,17 +41,27 @@ def cleanup_stale_files(directory: Path, max_age_seconds: int = 300) -> None:
         if not directory.exists():
             return
 
-        current_time = time.time()
-        for item in directory.iterdir():
-            try:
-                if item.stat().st_mtime < current_time - max_age_seconds:
-                    if item.is_file() or item.is_symlink():
-                        item.unlink()
-                        logger.info(f"Background cleanup: removed file {item.name}")
-                    elif item.is_dir():
-                        shutil.rmtree(item)
-                        logger.info(f"Background cleanup: removed dir {item.name}")
-            except Exception as e:
-                logger.warning(f"Cleanup skipped {item.name}: {e}")
+        cutoff = time.time() - max_age_seconds
+        victims = []
+        # scandir's DirEntry caches the entry type from the directory listing,
+        # so the is_* checks below cost no extra syscalls; only stat() does
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                try:
+                    if entry.stat(follow_symlinks=False).st_mtime >= cutoff:
+                        continue
+                    if entry.is_symlink() or entry.is_file(follow_symlinks=False):
+                        victims.append((entry.path, entry.name, False))
+                    elif entry.is_dir(follow_symlinks=False):
+                        victims.append((entry.path, entry.name, True))
+                except Exception as e:
+                    logger.warning(f"Cleanup skipped {entry.name}: {e}")
+
+        if len(victims) > 1:
+            # Blocks until every deletion is done, so the task ends with the cleanup
+            with ThreadPoolExecutor(max_workers=_CLEANUP_WORKERS) as pool:
+                list(pool.map(_remove_stale_entry, victims))
+        elif victims:
+            _remove_stale_entry(victims[0])
     except Exception as e:
         logger.error(f"Background cleanup process failed: {e}")
@@ -0,0 +1,46 @@
+import functools
+import os
+import threading
+from types import SimpleNamespace
+
+# vertexai is imported inside init_vertex() — google-cloud-aiplatform has a heavy
+# import chain, and most processes importing this module never call Gemini.
+
+@functools.lru_cache(maxsize=1)
+def vertex_settings() -> SimpleNamespace:
+    """
+    Vertex AI settings shared by every Gemini caller, read from the environment
+    (and .env) once. GOOGLE_CLOUD_PROJECT / REGION are the documented names;
+    GCP_PROJECT_ID / GCP_LOCATION are still accepted as fallbacks.
+    """
+    from dotenv import load_dotenv
+    load_dotenv()
+    return SimpleNamespace(
+        project_id=(
+            os.getenv("GOOGLE_CLOUD_PROJECT")
+            or os.getenv("GCP_PROJECT_ID")
+            or "veridoc-frontend-808108840598"
+        ),
+        location=os.getenv("REGION") or os.getenv("GCP_LOCATION") or "asia-south1",
+        api_transport=os.getenv("VERTEX_API_TRANSPORT", "grpc"),
+        api_endpoint=os.getenv("VERTEX_API_ENDPOINT") or None,
+    )
+
+_initialized = False
+_init_lock = threading.Lock()
+
+def init_vertex() -> None:
+    """Run vertexai.init() at most once per process; a failed init is retried on the next call."""
+    global _initialized
+    with _init_lock:
+        if _initialized:
+            return
+        import vertexai
+
+        cfg = vertex_settings()
+        # gRPC keeps one HTTP/2 channel per client; cached models reuse the warm channel.
+        init_kwargs = {"api_transport": cfg.api_transport}
+        if cfg.api_endpoint:
+            init_kwargs["api_endpoint"] = cfg.api_endpoint
+        vertexai.init(project=cfg.project_id, location=cfg.location, **init_kwargs)
+        _initialized = True